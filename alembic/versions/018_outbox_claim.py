@@ -0,0 +1,38 @@
+"""Add 'sending' outbox status and claimed_at for atomic batch claiming.
+
+Revision ID: 018_outbox_claim
+Revises: 017_add_message_read_tracking
+"""
+
+from typing import Union
+
+from alembic import op
+from sqlalchemy import inspect
+import sqlalchemy as sa
+
+revision: str = "018_outbox_claim"
+down_revision: Union[str, None] = "017_add_message_read_tracking"
+branch_labels: Union[str, None] = None
+depends_on: Union[str, None] = None
+
+
+def _col_exists(table: str, column: str) -> bool:
+    bind = op.get_bind()
+    insp = inspect(bind)
+    return column in [c["name"] for c in insp.get_columns(table)]
+
+
+def upgrade() -> None:
+    op.execute("ALTER TYPE outboxstatus ADD VALUE IF NOT EXISTS 'sending'")
+
+    if not _col_exists("outbox_messages", "claimed_at"):
+        op.add_column(
+            "outbox_messages",
+            sa.Column("claimed_at", sa.DateTime(timezone=True), nullable=True),
+        )
+
+
+def downgrade() -> None:
+    if _col_exists("outbox_messages", "claimed_at"):
+        op.drop_column("outbox_messages", "claimed_at")
+    # PostgreSQL does not support removing values from enums
@@ -0,0 +1,40 @@
+"""Link outbox_messages to the negotiation_messages row they deliver.
+
+Revision ID: 019_outbox_negotiation_message_id
+Revises: 018_outbox_claim
+"""
+
+from typing import Union
+
+from alembic import op
+from sqlalchemy import inspect
+import sqlalchemy as sa
+
+revision: str = "019_outbox_negotiation_message_id"
+down_revision: Union[str, None] = "018_outbox_claim"
+branch_labels: Union[str, None] = None
+depends_on: Union[str, None] = None
+
+
+def _col_exists(table: str, column: str) -> bool:
+    bind = op.get_bind()
+    insp = inspect(bind)
+    return column in [c["name"] for c in insp.get_columns(table)]
+
+
+def upgrade() -> None:
+    if not _col_exists("outbox_messages", "negotiation_message_id"):
+        op.add_column(
+            "outbox_messages",
+            sa.Column(
+                "negotiation_message_id",
+                sa.Integer(),
+                sa.ForeignKey("negotiation_messages.id", ondelete="SET NULL"),
+                nullable=True,
+            ),
+        )
+
+
+def downgrade() -> None:
+    if _col_exists("outbox_messages", "negotiation_message_id"):
+        op.drop_column("outbox_messages", "negotiation_message_id")
@@ -0,0 +1,29 @@
+"""Partial index on pending outbox messages for the worker claim query.
+
+Revision ID: 020_outbox_pending_idx
+Revises: 019_outbox_negotiation_message_id
+"""
+
+from typing import Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "020_outbox_pending_idx"
+down_revision: Union[str, None] = "019_outbox_negotiation_message_id"
+branch_labels: Union[str, None] = None
+depends_on: Union[str, None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "outbox_pending_idx",
+        "outbox_messages",
+        ["created_at"],
+        postgresql_where=sa.text("status = 'pending'"),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("outbox_pending_idx", table_name="outbox_messages", if_exists=True)
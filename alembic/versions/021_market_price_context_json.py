@@ -0,0 +1,53 @@
+"""Store detected_deals.market_price_context as JSON instead of a JSON string.
+
+Revision ID: 021_market_price_context_json
+Revises: 020_outbox_pending_idx
+"""
+
+from typing import Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "021_market_price_context_json"
+down_revision: Union[str, None] = "020_outbox_pending_idx"
+branch_labels: Union[str, None] = None
+depends_on: Union[str, None] = None
+
+
+def upgrade() -> None:
+    # Values were written with json.dumps, but legacy rows may hold text that
+    # is not valid JSON (the old reader skipped those on JSONDecodeError).
+    # Cast through a session-local helper that turns such rows into NULL
+    # instead of aborting the migration.
+    op.execute(
+        """
+        CREATE FUNCTION pg_temp.try_cast_json(value text) RETURNS json AS $$
+        BEGIN
+            RETURN value::json;
+        EXCEPTION WHEN others THEN
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql IMMUTABLE
+        """
+    )
+    op.alter_column(
+        "detected_deals",
+        "market_price_context",
+        existing_type=sa.Text(),
+        type_=sa.JSON(),
+        existing_nullable=True,
+        postgresql_using="pg_temp.try_cast_json(market_price_context)",
+    )
+    op.execute("DROP FUNCTION pg_temp.try_cast_json(text)")
+
+
+def downgrade() -> None:
+    op.alter_column(
+        "detected_deals",
+        "market_price_context",
+        existing_type=sa.JSON(),
+        type_=sa.Text(),
+        existing_nullable=True,
+        postgresql_using="market_price_context::text",
+    )
@@ -56,15 +56,15 @@ async def niche_analytics(
     result = await db.execute(deals_query)
     rows = result.fetchall()
 
-    analytics = {}
-    for row in rows:
-        niche_key = row.niche or "unknown"
-        analytics[niche_key] = {
-            "deals": row.deals,
-            "won_deals": row.won_deals,
-            "revenue": float(row.revenue or 0),
-            "avg_margin": round(float(row.avg_margin or 0), 2),
+    analytics = {
+        niche or "unknown": {
+            "deals": deals,
+            "won_deals": won_deals,
+            "revenue": float(revenue or 0),
+            "avg_margin": round(float(avg_margin or 0), 2),
         }
+        for niche, deals, won_deals, revenue, avg_margin in rows
+    }
 
     return analytics
 
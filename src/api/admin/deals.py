@@ -42,7 +42,7 @@ from src.schemas.deal import (
     OwnerDealResponse,
     SendMessageRequest,
 )
-from src.services.commission import calculate_commission_rate
+from src.services.commission import SYSTEM_LEAD_RATE, calculate_commission, calculate_commission_rate
 
 logger = logging.getLogger(__name__)
 
@@ -444,6 +444,7 @@ async def send_message(
         recipient_id=recipient_id,
         message_text=data.content,
         negotiation_id=deal.negotiation.id,
+        negotiation_message=message,
         sent_by_user_id=current_user.id,
         reply_to_message_id=reply_to_tg_id,
     )
@@ -546,8 +547,8 @@ async def close_deal(
         manager_commission = Decimal("0")
         commission_rate = Decimal("0")
         if deal.manager_id:
-            commission_rate = deal.manager_commission_rate or Decimal("0.20")
-            manager_commission = deal.margin * commission_rate
+            commission_rate = deal.manager_commission_rate or SYSTEM_LEAD_RATE
+            manager_commission = calculate_commission(deal.margin, commission_rate)
 
         ledger = LedgerEntry(
             deal_id=deal.id,
@@ -894,6 +895,7 @@ async def send_file(
         recipient_id=recipient_id,
         message_text=caption.strip() or None,
         negotiation_id=deal.negotiation.id,
+        negotiation_message=message,
         sent_by_user_id=current_user.id,
         media_type=media_type,
         media_file_path=file_path,
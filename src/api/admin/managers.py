@@ -31,7 +31,7 @@ from src.schemas.user import (
     ManagerUpdate,
 )
 from src.utils.audit import get_client_ip, log_action
-from src.utils.password import hash_password
+from src.utils.password import ahash_password
 
 router = APIRouter(prefix="/managers")
 templates = Jinja2Templates(directory="src/templates")
@@ -370,7 +370,7 @@ async def create_manager(
 
     manager = User(
         username=data.username,
-        password_hash=hash_password(data.password),
+        password_hash=await ahash_password(data.password),
         role=UserRole.MANAGER,
         display_name=data.display_name,
         is_active=True,
@@ -484,7 +484,7 @@ async def reset_manager_password(
             detail="Password must be at least 6 characters",
         )
 
-    manager.password_hash = hash_password(new_password)
+    manager.password_hash = await ahash_password(new_password)
 
     await log_action(
         db=db,
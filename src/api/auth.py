@@ -17,7 +17,7 @@ from src.db import get_db
 from src.models import AuditAction, User, UserRole
 from src.schemas.auth import LoginRequest, LoginResponse
 from src.utils.audit import get_client_ip, log_action
-from src.utils.password import verify_password
+from src.utils.password import averify_password
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 templates = Jinja2Templates(directory="src/templates")
@@ -115,7 +115,7 @@ async def login(
     user = result.scalar_one_or_none()
 
     # Verify credentials
-    if not user or not verify_password(credentials.password, user.password_hash):
+    if not user or not await averify_password(credentials.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password",
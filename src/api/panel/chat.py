@@ -38,6 +38,7 @@ from src.models import (
 from src.schemas.copilot import SuggestedResponses
 from src.schemas.deal import DealCloseRequest, MessageResponse, SendMessageRequest
 from src.services.ai_copilot import copilot
+from src.services.commission import calculate_commission
 
 
 class NotesRequest(BaseModel):
@@ -310,6 +311,7 @@ async def send_message(
         recipient_id=recipient_id,
         message_text=data.content,
         negotiation_id=negotiation_id,
+        negotiation_message=message,
         sent_by_user_id=current_user.id,
         reply_to_message_id=reply_to_tg_id,
     )
@@ -440,7 +442,7 @@ async def close_deal(
         manager_commission = Decimal("0")
         manager = await db.get(User, current_user.id)
         if manager and manager.commission_rate:
-            manager_commission = deal.margin * manager.commission_rate
+            manager_commission = calculate_commission(deal.margin, manager.commission_rate)
 
         ledger = LedgerEntry(
             deal_id=deal.id,
@@ -871,6 +873,7 @@ async def send_file(
         recipient_id=recipient_id,
         message_text=caption.strip() or None,
         negotiation_id=negotiation_id,
+        negotiation_message=message,
         sent_by_user_id=current_user.id,
         media_type=media_type,
         media_file_path=file_path,
@@ -135,13 +135,7 @@ async def get_lead_card(
             float(deal.margin / deal.sell_price * 100), 1
         )
 
-    # Parse market context
-    market_context = None
-    if deal.market_price_context:
-        try:
-            market_context = json.loads(deal.market_price_context)
-        except (json.JSONDecodeError, TypeError):
-            pass
+    market_context = deal.market_price_context
 
     # Get volume from sell order
     volume = None
@@ -312,6 +306,7 @@ async def send_draft(
         recipient_id=recipient_id,
         message_text=data.message,
         negotiation_id=negotiation.id,
+        negotiation_message=neg_message,
         sent_by_user_id=current_user.id,
     )
     db.add(outbox)
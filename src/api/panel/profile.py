@@ -12,7 +12,7 @@ from src.auth.dependencies import require_manager
 from src.db import get_db
 from src.models import DealStatus, DetectedDeal, User
 from src.schemas.user import PasswordChange, ProfileResponse
-from src.utils.password import hash_password, verify_password
+from src.utils.password import ahash_password, averify_password
 
 router = APIRouter(prefix="/profile")
 templates = Jinja2Templates(directory="src/templates")
@@ -91,14 +91,14 @@ async def change_password(
 ):
     """Change current user's password."""
     # Verify current password
-    if not verify_password(data.current_password, current_user.password_hash):
+    if not await averify_password(data.current_password, current_user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Неверный текущий пароль",
         )
 
     # Update password
-    current_user.password_hash = hash_password(data.new_password)
+    current_user.password_hash = await ahash_password(data.new_password)
     await db.commit()
 
     return {"success": True, "message": "Пароль успешно изменён"}
@@ -57,6 +57,10 @@ class Settings(BaseSettings):
         default="admin",
         description="Owner account password (created on first startup)"
     )
+    bcrypt_rounds: int = Field(
+        default=12,
+        description="bcrypt cost factor (log2 rounds) for new password hashes"
+    )
 
     # Telegram
     tg_api_id: int = Field(
@@ -29,6 +29,7 @@ from src.models import SystemSetting, User, UserRole
 from src.services.message_handler import handle_new_message
 from src.services.outbox_worker import run_outbox_worker
 from src.services.telegram_client import init_telegram_service, get_telegram_service
+from src.utils.audit import AuditMiddleware
 from src.utils.password import hash_password
 
 
@@ -177,6 +178,9 @@ app = FastAPI(
 # Add authentication middleware
 app.add_middleware(AuthMiddleware)
 
+# Batch audit log writes per request
+app.add_middleware(AuditMiddleware)
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="src/static"), name="static")
 
@@ -7,7 +7,7 @@ from decimal import Decimal
 from enum import Enum
 from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import BigInteger, DateTime, ForeignKey, Numeric, String, Text
+from sqlalchemy import JSON, BigInteger, DateTime, ForeignKey, Numeric, String, Text
 from sqlalchemy import Enum as SQLAlchemyEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -229,10 +229,10 @@ class DetectedDeal(Base, TimestampMixin):
         Text,
         nullable=True,
     )
-    market_price_context: Mapped[Optional[str]] = mapped_column(
-        Text,
+    market_price_context: Mapped[Optional[dict]] = mapped_column(
+        JSON,
         nullable=True,
-        comment="JSON: avg_price, min_seen, max_seen, sources_count",
+        comment="avg_price, min_seen, max_seen, sources_count",
     )
     platform: Mapped[str] = mapped_column(
         String(20),
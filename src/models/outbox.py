@@ -4,18 +4,22 @@ OutboxMessage model for outgoing Telegram messages.
 
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import BigInteger, DateTime, ForeignKey, String, Text, func
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, String, Text, func, text
 from sqlalchemy import Enum as SQLAlchemyEnum
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.models.base import Base
 
+if TYPE_CHECKING:
+    from src.models.negotiation import NegotiationMessage
+
 
 class OutboxStatus(str, Enum):
     """Status of outgoing message."""
     PENDING = "pending"  # Waiting to be sent
+    SENDING = "sending"  # Claimed by a worker, send in progress
     SENT = "sent"        # Successfully sent
     FAILED = "failed"    # Failed to send
 
@@ -55,6 +59,11 @@ class OutboxMessage(Base):
         nullable=True,
         comment="Related negotiation if applicable",
     )
+    negotiation_message_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("negotiation_messages.id", ondelete="SET NULL"),
+        nullable=True,
+        comment="Chat history entry that receives the Telegram message ID once sent",
+    )
     sent_by_user_id: Mapped[Optional[int]] = mapped_column(
         ForeignKey("users.id"),
         nullable=True,
@@ -90,10 +99,29 @@ class OutboxMessage(Base):
         server_default=func.now(),
         nullable=False,
     )
+    claimed_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+        comment="When a worker claimed the message for sending",
+    )
     sent_at: Mapped[Optional[datetime]] = mapped_column(
         DateTime(timezone=True),
         nullable=True,
     )
 
+    # Relationships
+    negotiation_message: Mapped[Optional["NegotiationMessage"]] = relationship(
+        "NegotiationMessage",
+    )
+
+    __table_args__ = (
+        # Serves the worker's "pending, oldest first" claim query
+        Index(
+            "outbox_pending_idx",
+            "created_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
+
     def __repr__(self) -> str:
         return f"<OutboxMessage(id={self.id}, status={self.status})>"
@@ -93,7 +93,7 @@ class OwnerDealResponse(BaseModel):
     our_commission_status: str = "pending"
     payment_method: Optional[str] = None
     ai_draft_message: Optional[str] = None
-    market_price_context: Optional[str] = None  # JSON string
+    market_price_context: Optional[dict] = None
     platform: str = "telegram"
 
     model_config = {"from_attributes": True}
@@ -157,7 +157,7 @@ class ManagerDealResponse(BaseModel):
     lead_source: Optional[str] = None
     niche: Optional[str] = None
     ai_draft_message: Optional[str] = None
-    market_price_context: Optional[str] = None  # Manager sees market context
+    market_price_context: Optional[dict] = None  # Manager sees market context
     platform: str = "telegram"
 
     # Seller city (from sell order region)
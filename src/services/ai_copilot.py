@@ -10,10 +10,12 @@ AI Copilot — генерация подсказок для менеджера.
 
 import json
 import logging
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.models import DetectedDeal, Order, SystemSetting
@@ -22,6 +24,31 @@ from src.services.ai_negotiator import generate_response
 
 logger = logging.getLogger(__name__)
 
+# Short-lived cache for build_market_context: deal bursts for the same
+# product and niche would otherwise re-run the same aggregate query.
+_MARKET_CONTEXT_TTL = 60.0  # seconds
+_MARKET_CONTEXT_MAX = 1024
+_market_context_cache: "OrderedDict[tuple, tuple[float, dict]]" = OrderedDict()
+
+
+def _market_context_get(key: tuple) -> Optional[dict]:
+    entry = _market_context_cache.get(key)
+    if entry is None:
+        return None
+    stored_at, value = entry
+    if time.monotonic() - stored_at > _MARKET_CONTEXT_TTL:
+        del _market_context_cache[key]
+        return None
+    _market_context_cache.move_to_end(key)
+    return dict(value)
+
+
+def _market_context_put(key: tuple, value: dict) -> None:
+    _market_context_cache[key] = (time.monotonic(), dict(value))
+    _market_context_cache.move_to_end(key)
+    if len(_market_context_cache) > _MARKET_CONTEXT_MAX:
+        _market_context_cache.popitem(last=False)
+
 
 async def get_ai_mode(db: AsyncSession) -> str:
     """Get AI mode from system settings.
@@ -149,6 +176,19 @@ class AICopilot:
             "trend": "stable" | "rising" | "falling"
         }
         """
+        product_filter = ""
+        if product:
+            from src.services.message_handler import _normalize_product
+            normalized = _normalize_product(product)
+            if len(normalized) >= 3:
+                product_filter = normalized[:10]
+
+        # Key on the effective filters so spelling variants share an entry
+        cache_key = (product_filter, niche or "")
+        cached = _market_context_get(cache_key)
+        if cached is not None:
+            return cached
+
         week_ago = datetime.now(timezone.utc) - timedelta(days=7)
 
         query = (
@@ -165,32 +205,40 @@ class AICopilot:
             query = query.where(Order.niche == niche)
 
         # Try to match product name
-        if product:
-            from src.services.message_handler import _normalize_product
-            normalized = _normalize_product(product)
-            if len(normalized) >= 3:
-                query = query.where(Order.product.ilike(f"%{normalized[:10]}%"))
+        if product_filter:
+            query = query.where(Order.product.ilike(f"%{product_filter}%"))
 
-        result = await db.execute(query.limit(100))
-        prices = [float(row[0]) for row in result.fetchall() if row[0]]
+        # Aggregate in SQL over the same 100-row sample instead of loading prices
+        sample = query.limit(100).subquery()
+        result = await db.execute(
+            select(
+                func.count(),
+                func.min(sample.c.price),
+                func.max(sample.c.price),
+                func.avg(sample.c.price),
+            )
+        )
+        sources_count, min_price, max_price, avg_price = result.one()
 
-        if not prices:
-            return {
+        if not sources_count:
+            context = {
                 "avg_price": None,
                 "min_seen": None,
                 "max_seen": None,
                 "sources_count": 0,
                 "trend": "unknown",
             }
+        else:
+            context = {
+                "avg_price": round(float(avg_price), 0),
+                "min_seen": round(float(min_price), 0),
+                "max_seen": round(float(max_price), 0),
+                "sources_count": sources_count,
+                "trend": "stable",  # TODO: trend analysis with time series
+            }
 
-        avg_price = sum(prices) / len(prices)
-        return {
-            "avg_price": round(avg_price, 0),
-            "min_seen": round(min(prices), 0),
-            "max_seen": round(max(prices), 0),
-            "sources_count": len(prices),
-            "trend": "stable",  # TODO: trend analysis with time series
-        }
+        _market_context_put(cache_key, context)
+        return context
 
 
 # Singleton instance
@@ -255,51 +255,59 @@ _NEGATED_PROBLEM_STEMS = [
     'дефект', 'царапин', 'скол', 'трещин', 'проблем',
     'повреждени', 'косяк', 'нюанс', 'претензи', 'поломк', 'поломок',
 ]
+_NEGATED_PROBLEM_PATTERN = re.compile(
+    # "дефектов нет", "царапин нет" | "нет дефектов", "нет проблем"
+    rf'(?:{"|".join(_NEGATED_PROBLEM_STEMS)})\w*\s+нет\b'
+    rf'|\bнет\s+(?:{"|".join(_NEGATED_PROBLEM_STEMS)})'
+)
 
 
 def _is_negated_problem(text_lower: str) -> bool:
     """Check if 'нет' negates a problem word (e.g., 'дефектов нет' = positive, not rejection)."""
-    for stem in _NEGATED_PROBLEM_STEMS:
-        # "дефектов нет", "царапин нет"
-        if re.search(rf'{stem}\w*\s+нет\b', text_lower):
-            return True
-        # "нет дефектов", "нет проблем"
-        if re.search(rf'\bнет\s+{stem}', text_lower):
-            return True
-    return False
+    return _NEGATED_PROBLEM_PATTERN.search(text_lower) is not None
+
+
+# Markers of topics already covered in the dialog (see _analyze_discussed_topics)
+_DISCUSSED_CONDITION_MARKERS = (
+    'состояние', 'царапин', 'сколы', 'дефект', 'работает', 'идеал', 'комплект', 'коробка',
+    'износ', 'повреждени', 'исправн', 'качество', 'целост',
+)
+_DISCUSSED_CITY_MARKERS = (
+    'город', 'откуда', 'территориально', 'москв', 'мск', 'спб', 'питер', 'екб',
+    'расположен', 'регион', 'находи',
+)
+_DISCUSSED_SPECS_MARKERS = (
+    'память', 'конфигурац', 'цвет', 'гб', 'gb', 'процессор', 'версия',
+    'параметр', 'размер', 'марка', 'модель', 'тип', 'сорт',
+)
+_DISCUSSED_PREFERENCES_MARKERS = (
+    'предпочтен', 'интересует', 'какой именно', 'что ищешь', 'что нужно',
+)
+# One alternation per topic: a single pass over the dialog per topic
+# instead of a substring scan per marker
+_DISCUSSED_TOPIC_PATTERNS = tuple(
+    (topic, re.compile("|".join(map(re.escape, markers))))
+    for topic, markers in (
+        ("condition", _DISCUSSED_CONDITION_MARKERS),
+        ("city", _DISCUSSED_CITY_MARKERS),
+        ("specs", _DISCUSSED_SPECS_MARKERS),
+        ("preferences", _DISCUSSED_PREFERENCES_MARKERS),
+    )
+)
 
 
 def _analyze_discussed_topics(context: List[dict]) -> set:
     """Scan conversation context for already discussed topics."""
-    discussed = set()
     all_text = " ".join(m["content"].lower() for m in context)
+    return {
+        topic for topic, pattern in _DISCUSSED_TOPIC_PATTERNS
+        if pattern.search(all_text)
+    }
 
-    condition_markers = [
-        'состояние', 'царапин', 'сколы', 'дефект', 'работает', 'идеал', 'комплект', 'коробка',
-        'износ', 'повреждени', 'исправн', 'качество', 'целост',
-    ]
-    city_markers = [
-        'город', 'откуда', 'территориально', 'москв', 'мск', 'спб', 'питер', 'екб',
-        'расположен', 'регион', 'находи',
-    ]
-    specs_markers = [
-        'память', 'конфигурац', 'цвет', 'гб', 'gb', 'процессор', 'версия',
-        'параметр', 'размер', 'марка', 'модель', 'тип', 'сорт',
-    ]
-    preferences_markers = [
-        'предпочтен', 'интересует', 'какой именно', 'что ищешь', 'что нужно',
-    ]
-
-    if any(m in all_text for m in condition_markers):
-        discussed.add("condition")
-    if any(m in all_text for m in city_markers):
-        discussed.add("city")
-    if any(m in all_text for m in specs_markers):
-        discussed.add("specs")
-    if any(m in all_text for m in preferences_markers):
-        discussed.add("preferences")
 
-    return discussed
+_SUMMARY_QUESTION_PATTERN = re.compile(
+    "|".join(map(re.escape, ("?", "ты бот", "кто ты", "почему", "зачем", "откуда", "сколько")))
+)
 
 
 def build_conversation_summary(context: List[dict]) -> str:
@@ -312,43 +320,39 @@ def build_conversation_summary(context: List[dict]) -> str:
     Returns:
         Multi-line summary string, or empty string if context has < 2 messages.
     """
-    if len(context) < 2:
+    n = len(context)
+    if n < 2:
         return ""
 
     lines = []
     step = 0
     i = 0
-    _question_markers = ["?", "ты бот", "кто ты", "почему", "зачем", "откуда", "сколько"]
 
-    while i < len(context):
+    while i < n:
         msg = context[i]
-        role_label = "Ты" if msg["role"] == "ai" else "Собеседник"
+        role = msg["role"]
+        role_label = "Ты" if role == "ai" else "Собеседник"
         content_short = msg["content"][:80].replace("\n", " ")
+        step += 1
 
         # Try to pair with next message if roles differ
-        if i + 1 < len(context) and context[i]["role"] != context[i + 1]["role"]:
+        if i + 1 < n and role != context[i + 1]["role"]:
             next_msg = context[i + 1]
             next_role = "Ты" if next_msg["role"] == "ai" else "Собеседник"
             next_content = next_msg["content"][:80].replace("\n", " ")
-            step += 1
-            # Check if the counterparty's response contains an unanswered question
-            counterparty_msg = next_msg if next_msg["role"] != "ai" else msg
-            has_question = any(m in counterparty_msg["content"].lower() for m in _question_markers)
-            # Flag if counterparty asked a question AND it's the last pair (no AI response after)
-            if has_question and counterparty_msg["role"] != "ai" and i + 2 >= len(context):
-                lines.append(
-                    f"{step}. {role_label}: {content_short} → {next_role}: {next_content} "
-                    f"→ (НЕ ОТВЕЧЕНО — ответь!)"
-                )
-            else:
-                lines.append(f"{step}. {role_label}: {content_short} → {next_role}: {next_content}")
+            line = f"{step}. {role_label}: {content_short} → {next_role}: {next_content}"
+            # Only the last pair can hold an unanswered counterparty question
+            if i + 2 >= n:
+                counterparty_msg = next_msg if next_msg["role"] != "ai" else msg
+                if (counterparty_msg["role"] != "ai"
+                        and _SUMMARY_QUESTION_PATTERN.search(counterparty_msg["content"].lower())):
+                    line += " → (НЕ ОТВЕЧЕНО — ответь!)"
+            lines.append(line)
             i += 2
             continue
 
         # Unpaired message
-        step += 1
-        is_question = any(m in msg["content"].lower() for m in _question_markers)
-        if msg["role"] != "ai" and is_question:
+        if role != "ai" and _SUMMARY_QUESTION_PATTERN.search(msg["content"].lower()):
             lines.append(f"{step}. Собеседник спросил: {content_short} → (НЕ ОТВЕЧЕНО — ответь!)")
         else:
             lines.append(f"{step}. {role_label}: {content_short}")
@@ -357,6 +361,11 @@ def build_conversation_summary(context: List[dict]) -> str:
     return "\n".join(lines)
 
 
+_UNANSWERED_QUESTION_PATTERN = re.compile(
+    "|".join(map(re.escape, ("?", "ты бот", "кто ты", "почему", "зачем", "откуда")))
+)
+
+
 def _detect_unanswered_question(context: List[dict]) -> Optional[str]:
     """
     Check if the last non-AI message contains a question that hasn't been answered.
@@ -371,8 +380,7 @@ def _detect_unanswered_question(context: List[dict]) -> Optional[str]:
         return None
 
     text = last_msg["content"]
-    question_markers = ["?", "ты бот", "кто ты", "почему", "зачем", "откуда"]
-    if any(marker in text.lower() for marker in question_markers):
+    if _UNANSWERED_QUESTION_PATTERN.search(text.lower()):
         return text
 
     return None
@@ -755,17 +763,20 @@ def _extract_specs_from_text(text: str) -> Optional[str]:
     return None
 
 
+_PREFERENCE_MARKERS = (
+    'цвет', 'размер', 'модель', 'тип', 'сорт', 'гб', 'gb',
+    'память', 'конфигурац', 'комплект', 'версия', 'марка',
+    'чёрный', 'черный', 'белый', 'серый', 'синий', 'красный', 'золотой',
+    'pro', 'plus', 'max', 'ultra', 'mini',
+    'материал', 'мощность',
+)
+# One C-level scan instead of a substring check per marker
+_PREFERENCE_PATTERN = re.compile("|".join(map(re.escape, _PREFERENCE_MARKERS)))
+
+
 def _extract_preferences_from_text(text: str) -> Optional[str]:
     """Try to extract buyer preferences from text."""
-    text_lower = text.lower()
-    pref_markers = [
-        'цвет', 'размер', 'модель', 'тип', 'сорт', 'гб', 'gb',
-        'память', 'конфигурац', 'комплект', 'версия', 'марка',
-        'чёрный', 'черный', 'белый', 'серый', 'синий', 'красный', 'золотой',
-        'pro', 'plus', 'max', 'ultra', 'mini',
-        'материал', 'мощность',
-    ]
-    if any(m in text_lower for m in pref_markers):
+    if _PREFERENCE_PATTERN.search(text.lower()):
         return text[:200].strip()
     return None
 
@@ -938,7 +949,7 @@ async def _initiate_copilot(deal: DetectedDeal, db: AsyncSession, copilot_svc) -
         "seller": seller_draft,
         "buyer": buyer_draft,
     }, ensure_ascii=False)
-    deal.market_price_context = json.dumps(context, ensure_ascii=False)
+    deal.market_price_context = context
 
     await db.flush()
     logger.info(
@@ -1021,6 +1032,7 @@ async def _initiate_autopilot(deal: DetectedDeal, db: AsyncSession) -> Optional[
         message_text=seller_message,
         status=OutboxStatus.PENDING,
         negotiation_id=negotiation.id,
+        negotiation_message=msg,
     )
     db.add(outbox_seller)
 
@@ -1058,6 +1070,7 @@ async def _initiate_autopilot(deal: DetectedDeal, db: AsyncSession) -> Optional[
             message_text=buyer_message,
             status=OutboxStatus.PENDING,
             negotiation_id=negotiation.id,
+            negotiation_message=buyer_msg,
         )
         db.add(outbox_buyer)
         logger.info(f"Сделка {deal.id}: сообщения отправлены продавцу и покупателю")
@@ -1272,6 +1285,7 @@ async def process_seller_response(
                     message_text=response,
                     status=OutboxStatus.PENDING,
                     negotiation_id=negotiation.id,
+                    negotiation_message=goodbye_msg,
                 )
                 db.add(outbox)
 
@@ -1293,6 +1307,7 @@ async def process_seller_response(
                 message_text=response,
                 status=OutboxStatus.PENDING,
                 negotiation_id=negotiation.id,
+                negotiation_message=ai_msg,
             )
             db.add(outbox)
 
@@ -1496,6 +1511,7 @@ async def process_buyer_response(
                     message_text=response,
                     status=OutboxStatus.PENDING,
                     negotiation_id=negotiation.id,
+                    negotiation_message=goodbye_msg,
                 )
                 db.add(outbox)
 
@@ -1517,6 +1533,7 @@ async def process_buyer_response(
                 message_text=response,
                 status=OutboxStatus.PENDING,
                 negotiation_id=negotiation.id,
+                negotiation_message=ai_msg,
             )
             db.add(outbox)
 
@@ -7,7 +7,7 @@ Rules:
 - Custom rate on manager overrides the default
 """
 
-from decimal import Decimal
+from decimal import ROUND_HALF_UP, Decimal
 
 from src.models.deal import DetectedDeal
 from src.models.user import User
@@ -15,6 +15,9 @@ from src.models.user import User
 # Default commission rates
 SYSTEM_LEAD_RATE = Decimal("0.20")   # 20% for AI-found leads
 MANAGER_LEAD_RATE = Decimal("0.35")  # 35% for manager-sourced leads
+LEGACY_DEFAULT_RATE = Decimal("0.10")  # old users.commission_rate default
+
+_CENTS = Decimal("0.01")
 
 
 def calculate_commission_rate(deal: DetectedDeal, manager: User) -> Decimal:
@@ -36,8 +39,17 @@ def calculate_commission_rate(deal: DetectedDeal, manager: User) -> Decimal:
         base_rate = SYSTEM_LEAD_RATE
 
     # Custom rate on manager overrides the tier default
-    if manager.commission_rate is not None and manager.commission_rate != Decimal("0.10"):
+    if manager.commission_rate is not None and manager.commission_rate != LEGACY_DEFAULT_RATE:
         # 0.10 is the old default — treat it as "not customised"
         return manager.commission_rate
 
     return base_rate
+
+
+def calculate_commission(margin: Decimal, rate: Decimal) -> Decimal:
+    """Manager commission for a margin, rounded half-up to kopecks.
+
+    Matches the Numeric(12, 2) scale of ledger.manager_commission, so the
+    stored amount no longer depends on the database's rounding.
+    """
+    return (margin * rate).quantize(_CENTS, rounding=ROUND_HALF_UP)
@@ -1,9 +1,13 @@
 """OpenAI LLM integration for AI negotiations."""
 
 import asyncio
+import hashlib
 import json
 import logging
-from typing import Dict, List, Optional
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 
 from openai import AsyncOpenAI
 
@@ -78,14 +82,41 @@ _BUYER_EXAMPLES = """\
 - Называть конкретную цену товара"""
 
 
+# Apart from the per-turn conversation summary, prompts depend only on a
+# handful of known/missing field combinations. The builders memoize the text
+# around the summary on a hashable form of those fields and splice the
+# summary in uncached, so dialog text is never retained by the cache.
+_PROMPT_CACHE_SIZE = 256
+
+
+def _join_prompt(head: str, conversation_summary: Optional[str], tail: str) -> str:
+    """Assemble a prompt from cached head/tail and the uncached summary."""
+    if conversation_summary:
+        # Conversation summary (memory)
+        return f"{head}\n\nКРАТКОЕ СОДЕРЖАНИЕ ДИАЛОГА:\n{conversation_summary}\n{tail}"
+    return f"{head}\n{tail}"
+
+
 def build_seller_system_prompt(
     known_data: Optional[Dict[str, str]] = None,
     missing_fields: Optional[List[str]] = None,
     conversation_summary: Optional[str] = None,
 ) -> str:
     """Build dynamic system prompt for talking TO a seller."""
-    known = known_data or {}
-    missing = missing_fields or []
+    head, tail = _build_seller_prompt_parts(
+        tuple(sorted((known_data or {}).items())),
+        tuple(missing_fields or ()),
+    )
+    return _join_prompt(head, conversation_summary, tail)
+
+
+@lru_cache(maxsize=_PROMPT_CACHE_SIZE)
+def _build_seller_prompt_parts(
+    known_items: Tuple[Tuple[str, str], ...],
+    missing: Tuple[str, ...],
+) -> Tuple[str, str]:
+    """Return the prompt text before and after the conversation summary."""
+    known = dict(known_items)
 
     parts = [
         _PERSONALITY,
@@ -113,11 +144,9 @@ def build_seller_system_prompt(
         for line in known_lines:
             parts.append(f"- {line}")
 
-    # Conversation summary (memory)
-    if conversation_summary:
-        parts.append("")
-        parts.append("КРАТКОЕ СОДЕРЖАНИЕ ДИАЛОГА:")
-        parts.append(conversation_summary)
+    # The conversation summary goes here; _join_prompt splices it in
+    head = "\n".join(parts)
+    parts = []
 
     # What's still needed — soft guidance, NOT rigid checklist
     if missing:
@@ -159,7 +188,7 @@ def build_seller_system_prompt(
     parts.append('- "close" — продавец отказал/товар продан, вежливо попрощайся')
     parts.append('- "warm" — получили номер телефона (извлеки его в поле phone)')
 
-    return "\n".join(parts)
+    return head, "\n".join(parts)
 
 
 def build_buyer_system_prompt(
@@ -168,8 +197,20 @@ def build_buyer_system_prompt(
     conversation_summary: Optional[str] = None,
 ) -> str:
     """Build dynamic system prompt for talking TO a buyer."""
-    known = known_data or {}
-    missing = missing_fields or []
+    head, tail = _build_buyer_prompt_parts(
+        tuple(sorted((known_data or {}).items())),
+        tuple(missing_fields or ()),
+    )
+    return _join_prompt(head, conversation_summary, tail)
+
+
+@lru_cache(maxsize=_PROMPT_CACHE_SIZE)
+def _build_buyer_prompt_parts(
+    known_items: Tuple[Tuple[str, str], ...],
+    missing: Tuple[str, ...],
+) -> Tuple[str, str]:
+    """Return the prompt text before and after the conversation summary."""
+    known = dict(known_items)
 
     parts = [
         _PERSONALITY,
@@ -203,11 +244,9 @@ def build_buyer_system_prompt(
         for line in known_lines:
             parts.append(f"- {line}")
 
-    # Conversation summary (memory)
-    if conversation_summary:
-        parts.append("")
-        parts.append("КРАТКОЕ СОДЕРЖАНИЕ ДИАЛОГА:")
-        parts.append(conversation_summary)
+    # The conversation summary goes here; _join_prompt splices it in
+    head = "\n".join(parts)
+    parts = []
 
     # What's still needed — soft guidance
     if missing:
@@ -246,7 +285,7 @@ def build_buyer_system_prompt(
     parts.append('- "close" — покупатель отказался / не интересно')
     parts.append('- "warm" — получили номер телефона (извлеки его в поле phone)')
 
-    return "\n".join(parts)
+    return head, "\n".join(parts)
 
 
 # Static fallbacks (used when known_data/missing_fields not available)
@@ -385,6 +424,38 @@ _ORDER_EXTRACTION_PROMPT = """\
 - Если сообщение НЕ является заявкой на покупку/продажу — order_type: null"""
 
 
+# Exact-match cache for deterministic (temperature=0) completions: the same
+# announcement is often reposted across chats and parses to the same result.
+_RESPONSE_CACHE_TTL = 3600.0  # seconds
+_RESPONSE_CACHE_MAX = 1024
+_response_cache: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+
+
+def _response_cache_key(**request) -> str:
+    """Stable hash of a completion request (model, messages, parameters)."""
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _response_cache_get(key: str) -> Optional[dict]:
+    entry = _response_cache.get(key)
+    if entry is None:
+        return None
+    stored_at, value = entry
+    if time.monotonic() - stored_at > _RESPONSE_CACHE_TTL:
+        del _response_cache[key]
+        return None
+    _response_cache.move_to_end(key)
+    return dict(value)
+
+
+def _response_cache_put(key: str, value: dict) -> None:
+    _response_cache[key] = (time.monotonic(), dict(value))
+    _response_cache.move_to_end(key)
+    if len(_response_cache) > _RESPONSE_CACHE_MAX:
+        _response_cache.popitem(last=False)
+
+
 async def extract_order_llm(text: str, timeout: float = 5.0) -> Optional[dict]:
     """Extract structured order data from text using GPT-4o-mini.
 
@@ -399,24 +470,32 @@ async def extract_order_llm(text: str, timeout: float = 5.0) -> Optional[dict]:
     if not client:
         return None
 
+    request = {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "system", "content": _ORDER_EXTRACTION_PROMPT},
+            {"role": "user", "content": text},
+        ],
+        "temperature": 0,
+        "max_tokens": 300,
+        "response_format": {"type": "json_object"},
+    }
+    cache_key = _response_cache_key(**request)
+    cached = _response_cache_get(cache_key)
+    if cached is not None:
+        logger.debug("LLM extraction cache hit")
+        return cached
+
     try:
         response = await asyncio.wait_for(
-            client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": _ORDER_EXTRACTION_PROMPT},
-                    {"role": "user", "content": text},
-                ],
-                temperature=0,
-                max_tokens=300,
-                response_format={"type": "json_object"},
-            ),
+            client.chat.completions.create(**request),
             timeout=timeout,
         )
         raw = response.choices[0].message.content
         result = json.loads(raw)
         if not isinstance(result, dict):
             return None
+        _response_cache_put(cache_key, result)
 
         logger.info(f"LLM extraction result: order_type={result.get('order_type')}, product={result.get('product')}")
         return result
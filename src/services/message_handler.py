@@ -11,11 +11,13 @@ Handles:
 import logging
 import re
 from decimal import Decimal
+from functools import lru_cache
 from typing import Optional, Tuple
 
 from sqlalchemy import and_, or_, select
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import selectinload
+from telethon.tl.types import DocumentAttributeAudio
 
 from src.db import get_db_context
 from src.models import (
@@ -27,6 +29,9 @@ from src.services.ai_negotiator import initiate_negotiation, process_seller_resp
 
 logger = logging.getLogger(__name__)
 
+# Shared zero for price fallbacks in the deal-matching loop
+_ZERO = Decimal(0)
+
 # Patterns for detecting buy/sell intent
 BUY_KEYWORDS = [
     # Существующие
@@ -134,26 +139,57 @@ AGRICULTURE_PRODUCTS = {
 # Объединённый словарь для текущего парсинга
 PRODUCT_PATTERNS = {**CONSTRUCTION_PRODUCTS}
 
-# Price patterns - more specific to avoid matching model numbers
+# Compiled once; the parser runs on every monitored chat message
+_CONSTRUCTION_PRODUCT_REGEXES = [
+    (re.compile(p, re.IGNORECASE), name) for p, name in CONSTRUCTION_PRODUCTS.items()
+]
+# End of the product description after the product name
+_PRODUCT_DELIM_RE = re.compile(r'[,\n?!]|\.\s|\d{4,}\s*(?:р|руб|₽|/)')
+# Grade: А500С, М500, В25, D500, С21
+_PRODUCT_GRADE_RE = re.compile(
+    r'[АаAa]\d+[СсCcВвBb]?\d*|[МмMm]\d+|[ВвBb]\d+|[DdДд]\d+|[СсCc]\d+', re.IGNORECASE,
+)
+# Diameter: д12, 10мм, 0.5мм, 10-12мм
+_PRODUCT_DIAMETER_RE = re.compile(
+    r'(?:[дd∅⌀]\s*)?\d+(?:[.,]\d+)?(?:\s*[-–]\s*\d+(?:[.,]\d+)?)?\s*мм|[дd]\d+', re.IGNORECASE,
+)
+# Size: 150х150, 600х300х200
+_PRODUCT_SIZE_RE = re.compile(r'\d+\s*[хx×]\s*\d+(?:\s*[хx×]\s*\d+)?')
+# Fallback product: text after a keyword up to a comma, newline or price
+_FALLBACK_PRODUCT_SPLIT_RE = re.compile(r'[,\n]|(?:\d+\s*(?:т\.?р|тыс|к|руб|р|₽))')
+_LEADING_PUNCT_RE = re.compile(r'^[!.\s]+')
+
+# Price patterns - more specific to avoid matching model numbers.
+# Each pattern captures the number as (?P<num>...) and, where a multiplier
+# may follow, the suffix as (?P<unit>...) — see _PRICE_UNIT_SCALE.
 PRICE_PATTERNS = [
     # Dot-as-thousand-separator: "130.000", "1.500.000" (Russian convention)
     # Must be first to match before explicit markers split "1.500.000" into "1.500"
-    r'(\d{1,3}(?:\.\d{3})+)',
+    r'(?P<num>\d{1,3}(?:\.\d{3})+)',
     # Explicit price markers: "цена 100к", "за 50 тыс", "стоит 30000"
-    r'(?:цена|за|стоит|стоимость|прошу|отдам за|продам за|продаю за|хочу)[:\s]*(\d[\d\s]*(?:[.,]\d+)?)\s*(?:т\.?р\.?|тыс\.?|к|руб|р|₽|\$)?',
+    r'(?:цена|за|стоит|стоимость|прошу|отдам за|продам за|продаю за|хочу)[:\s]*(?P<num>\d[\d\s]*(?:[.,]\d+)?)\s*(?P<unit>т\.?р\.?|тыс\.?|к|руб|р|₽|\$)?',
     # Shorthand with multiplier: "100к", "50 тыс", "30т.р.", "100 к" (разрешаем пробел перед к)
-    r'(\d[\d\s]*(?:[.,]\d+)?)\s*(?:т\.?р\.?|тыс\.?|тысяч|к)(?:\b|[,.\s]|$)',
+    r'(?P<num>\d[\d\s]*(?:[.,]\d+)?)\s*(?P<unit>т\.?р\.?|тыс\.?|тысяч|к)(?:\b|[,.\s]|$)',
     # Full rubles: "30000 руб", "50000₽", "100000р"
-    r'(\d{4,}[\d\s]*(?:[.,]\d+)?)\s*(?:руб\.?|р\.?|₽)',
+    r'(?P<num>\d{4,}[\d\s]*(?:[.,]\d+)?)\s*(?:руб\.?|р\.?|₽)',
     # Standalone large number (5-7 digits): likely a price
-    r'(?:^|[^\d])(\d{5,7})(?:[^\d]|$)',
+    r'(?:^|[^\d])(?P<num>\d{5,7})(?:[^\d]|$)',
     # Number followed by "рублей": "50000 рублей"
-    r'(\d[\d\s]*(?:[.,]\d+)?)\s*рубл',
+    r'(?P<num>\d[\d\s]*(?:[.,]\d+)?)\s*рубл',
     # B2B: "48 500 руб/тонна", "3200 за м³", "4200/тн"
-    r'(\d+(?:\s\d{3})*)\s*(?:руб|₽|р)?\s*[/за]\s*(?:тонн[аыу]?|тн|т\b|м[²³23]|куб|шт|рулон|лист|мешок|поддон|вагон)',
+    r'(?P<num>\d+(?:\s\d{3})*)\s*(?:руб|₽|р)?\s*[/за]\s*(?:тонн[аыу]?|тн|т\b|м[²³23]|куб|шт|рулон|лист|мешок|поддон|вагон)',
     # B2B: "от 45000", "от 45 000"
-    r'от\s+(\d+(?:\s\d{3})*)\s*(?:руб|₽|р)?',
+    r'от\s+(?P<num>\d+(?:\s\d{3})*)\s*(?:руб|₽|р)?',
 ]
+_PRICE_REGEXES = [re.compile(p) for p in PRICE_PATTERNS]
+
+# Scale factor for the captured (?P<unit>...) suffix, keyed with dots removed
+_PRICE_UNIT_SCALE = {'к': 1000, 'тыс': 1000, 'тысяч': 1000, 'тр': 1000}
+
+_DOT_THOUSANDS_RE = re.compile(r'^\d{1,3}(\.\d{3})+$')
+
+# Every price pattern needs a digit; most chat messages have none
+_HAS_DIGIT = re.compile(r'\d').search
 
 # Unit patterns for B2B price-per-unit extraction
 UNIT_PATTERNS = [
@@ -174,6 +210,8 @@ PHONE_PATTERNS = [
     r'\+?[78]\d{10}',  # +79991234567
     r'\b\d{3}[\s\-]?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}\b',  # 999-123-45-67
 ]
+_PHONE_REGEXES = [re.compile(p) for p in PHONE_PATTERNS]
+_NON_DIGITS_RE = re.compile(r'\D')
 
 # Region patterns - expanded list with common abbreviations
 REGIONS = [
@@ -322,8 +360,8 @@ def extract_product(text: str) -> tuple[str | None, str | None]:
     text_lower = text.lower()
 
     # Сначала проверяем стройматериалы
-    for pattern, product_name in CONSTRUCTION_PRODUCTS.items():
-        match = re.search(pattern, text_lower, re.IGNORECASE)
+    for regex, product_name in _CONSTRUCTION_PRODUCT_REGEXES:
+        match = regex.search(text_lower)
         if match:
             # Get original-case text from match positions
             start, end = match.start(), match.end()
@@ -331,33 +369,24 @@ def extract_product(text: str) -> tuple[str | None, str | None]:
 
             # Get context after match up to next delimiter
             after_text = text[end:]
-            delim = re.search(r'[,\n?!]|\.\s|\d{4,}\s*(?:р|руб|₽|/)', after_text)
+            delim = _PRODUCT_DELIM_RE.search(after_text)
             context_chunk = after_text[:delim.start()] if delim else after_text[:60]
 
             parts = [base]
             base_lower = base.lower()
 
             # Look for grade NOT already captured: А500С, М500, В25, D500, С21
-            grade = re.search(
-                r'[АаAa]\d+[СсCcВвBb]?\d*|[МмMm]\d+|[ВвBb]\d+|[DdДд]\d+|[СсCc]\d+',
-                context_chunk, re.IGNORECASE,
-            )
+            grade = _PRODUCT_GRADE_RE.search(context_chunk)
             if grade and grade.group(0).lower() not in base_lower:
                 parts.append(grade.group(0))
 
             # Look for diameter: д12, 10мм, 0.5мм, 10-12мм
-            diam = re.search(
-                r'(?:[дd∅⌀]\s*)?\d+(?:[.,]\d+)?(?:\s*[-–]\s*\d+(?:[.,]\d+)?)?\s*мм|[дd]\d+',
-                context_chunk, re.IGNORECASE,
-            )
+            diam = _PRODUCT_DIAMETER_RE.search(context_chunk)
             if diam and diam.group(0).lower().strip() not in base_lower:
                 parts.append(diam.group(0).strip())
 
             # Look for size: 150х150, 600х300х200
-            size = re.search(
-                r'\d+\s*[хx×]\s*\d+(?:\s*[хx×]\s*\d+)?',
-                context_chunk,
-            )
+            size = _PRODUCT_SIZE_RE.search(context_chunk)
             if size and size.group(0) not in base_lower:
                 parts.append(size.group(0))
 
@@ -370,9 +399,9 @@ def extract_product(text: str) -> tuple[str | None, str | None]:
         if keyword in text_lower:
             idx = text_lower.find(keyword)
             after_keyword = text[idx + len(keyword):].strip()
-            chunk = re.split(r'[,\n]|(?:\d+\s*(?:т\.?р|тыс|к|руб|р|₽))', after_keyword)[0].strip()
+            chunk = _FALLBACK_PRODUCT_SPLIT_RE.split(after_keyword)[0].strip()
             if chunk and len(chunk) > 2:
-                chunk = re.sub(r'^[!.\s]+', '', chunk)
+                chunk = _LEADING_PUNCT_RE.sub('', chunk)
                 chunk = chunk[:100]
                 if chunk:
                     return (chunk, None)
@@ -385,38 +414,34 @@ def extract_price(text: str) -> Optional[Decimal]:
     Извлечение цены из текста сообщения.
     Обрабатывает форматы: 100к, 100 тыс, 100000 руб, цена 100к
     """
-    text_lower = text.lower()
+    if _HAS_DIGIT(text) is None:
+        return None
 
-    # Собираем все найденные цены
-    found_prices = []
+    text_lower = text.lower()
 
-    for pattern in PRICE_PATTERNS:
-        for match in re.finditer(pattern, text_lower):
+    # Паттерны упорядочены по надёжности: первая цена в диапазоне — основная
+    for regex in _PRICE_REGEXES:
+        for match in regex.finditer(text_lower):
             try:
-                price_str = match.group(1).replace(' ', '')
+                price_str = match.group('num').replace(' ', '')
                 # Detect dot-as-thousand-separator: "130.000" → "130000"
-                if re.match(r'^\d{1,3}(\.\d{3})+$', price_str):
+                if _DOT_THOUSANDS_RE.match(price_str):
                     price_str = price_str.replace('.', '')
                 else:
                     price_str = price_str.replace(',', '.')
                 price = Decimal(price_str)
 
                 # Проверяем множитель 'к' или 'тыс'
-                full_match = match.group(0).lower()
-                if any(m in full_match for m in ['к', 'тыс', 'т.р', 'тр']):
-                    price *= 1000
+                unit = match.groupdict().get('unit')
+                if unit:
+                    price *= _PRICE_UNIT_SCALE.get(unit.replace('.', ''), 1)
 
                 # Проверка диапазона — от 100 руб/шт (крепёж) до 50M (вагон)
                 if 100 <= price <= 50_000_000:
-                    found_prices.append(price)
+                    return price
             except Exception:
                 pass
 
-    # Возвращаем наиболее вероятную цену (предпочитаем среднюю)
-    if found_prices:
-        # Если найдено несколько цен, берём первую (обычно основная цена)
-        return found_prices[0]
-
     return None
 
 
@@ -425,17 +450,23 @@ def extract_phone(text: str) -> Optional[str]:
     Извлечение номера телефона из текста.
     Возвращает найденный номер или None.
     """
-    for pattern in PHONE_PATTERNS:
-        match = re.search(pattern, text)
+    for regex in _PHONE_REGEXES:
+        match = regex.search(text)
         if match:
             phone = match.group(0)
             # Нормализация - оставляем только цифры
-            digits = re.sub(r'\D', '', phone)
+            digits = _NON_DIGITS_RE.sub('', phone)
             if len(digits) >= 10:
                 return phone
     return None
 
 
+# Short abbreviations ('мск', 'нн', 'мо') must match as whole words
+_SHORT_REGION_REGEXES = {
+    region: re.compile(rf'\b{re.escape(region)}\b') for region in REGIONS if len(region) <= 3
+}
+
+
 def extract_region(text: str) -> Optional[str]:
     """
     Извлечение региона/города из текста сообщения.
@@ -446,8 +477,9 @@ def extract_region(text: str) -> Optional[str]:
     # Сначала ищем точные совпадения для сокращений
     for region in REGIONS:
         # Для коротких сокращений используем границы слов
-        if len(region) <= 3:
-            if re.search(rf'\b{re.escape(region)}\b', text_lower):
+        short_regex = _SHORT_REGION_REGEXES.get(region)
+        if short_regex is not None:
+            if short_regex.search(text_lower):
                 return REGION_NORMALIZE.get(region, region.title())
         else:
             if region in text_lower:
@@ -461,13 +493,14 @@ QUANTITY_PATTERNS = [
     r'(\d+)\s*(?:шт\.?|штук[иа]?|единиц[аы]?|ед\.?)',
     r'(?:количество|кол-во|кол\.?)\s*[:\-]?\s*(\d+)',
 ]
+_QUANTITY_REGEXES = [re.compile(p) for p in QUANTITY_PATTERNS]
 
 
 def extract_quantity(text: str) -> Optional[str]:
     """Извлечение количества из текста. Возвращает строку вида '5 шт' или None."""
     text_lower = text.lower()
-    for pattern in QUANTITY_PATTERNS:
-        match = re.search(pattern, text_lower)
+    for regex in _QUANTITY_REGEXES:
+        match = regex.search(text_lower)
         if match:
             qty = match.group(1) or match.group(2)
             if qty and int(qty) > 0:
@@ -475,6 +508,24 @@ def extract_quantity(text: str) -> Optional[str]:
     return None
 
 
+# Unit in a price-per-unit expression: '4200/тн', '580р/м²'
+_PRICE_UNIT_REGEXES = [(re.compile(p), unit) for p, unit in [
+    (r'\d\s*/\s*(тонн[аыу]?|тн|т)\b', 'тонна'),
+    (r'(?:руб|₽|р)\s*/?\s*(тонн[аыу]?|тн|т)\b', 'тонна'),
+    (r'\d\s*/\s*(м[²2]|кв\.?\s*м)', 'м²'),
+    (r'(?:руб|₽|р)\s*/?\s*(м[²2]|кв\.?\s*м)', 'м²'),
+    (r'\d\s*/\s*(м[³3]|куб\.?\s*м)', 'м³'),
+    (r'(?:руб|₽|р)\s*/?\s*(м[³3]|куб\.?\s*м)', 'м³'),
+    (r'\d\s*/\s*(шт|штук)', 'шт'),
+    (r'(?:руб|₽|р)\s*/?\s*(шт|штук)', 'шт'),
+    (r'\d\s*/\s*(рулон)', 'рулон'),
+    (r'\d\s*/\s*(лист)', 'лист'),
+    (r'\d\s*/\s*(мешок|мешк)', 'мешок'),
+    (r'\d\s*/\s*(поддон)', 'поддон'),
+    (r'\d\s*/\s*(вагон)', 'вагон'),
+]]
+
+
 def extract_price_unit(text: str) -> str | None:
     """Извлекает единицу измерения из выражения цены-за-единицу.
 
@@ -484,28 +535,29 @@ def extract_price_unit(text: str) -> str | None:
         '580р/м²' → 'м²'
         '12000 руб/м³' → 'м³'
     """
-    PRICE_UNIT_PATTERNS = [
-        (r'\d\s*/\s*(тонн[аыу]?|тн|т)\b', 'тонна'),
-        (r'(?:руб|₽|р)\s*/?\s*(тонн[аыу]?|тн|т)\b', 'тонна'),
-        (r'\d\s*/\s*(м[²2]|кв\.?\s*м)', 'м²'),
-        (r'(?:руб|₽|р)\s*/?\s*(м[²2]|кв\.?\s*м)', 'м²'),
-        (r'\d\s*/\s*(м[³3]|куб\.?\s*м)', 'м³'),
-        (r'(?:руб|₽|р)\s*/?\s*(м[³3]|куб\.?\s*м)', 'м³'),
-        (r'\d\s*/\s*(шт|штук)', 'шт'),
-        (r'(?:руб|₽|р)\s*/?\s*(шт|штук)', 'шт'),
-        (r'\d\s*/\s*(рулон)', 'рулон'),
-        (r'\d\s*/\s*(лист)', 'лист'),
-        (r'\d\s*/\s*(мешок|мешк)', 'мешок'),
-        (r'\d\s*/\s*(поддон)', 'поддон'),
-        (r'\d\s*/\s*(вагон)', 'вагон'),
-    ]
     text_lower = text.lower()
-    for pattern, unit in PRICE_UNIT_PATTERNS:
-        if re.search(pattern, text_lower):
+    for regex, unit in _PRICE_UNIT_REGEXES:
+        if regex.search(text_lower):
             return unit
     return None
 
 
+# Volume with its unit: '20 тонн', '1 вагон', '~500м²'
+_VOLUME_REGEXES = [(re.compile(p), unit) for p, unit in [
+    (r'(\d[\d\s.,]*\d?)\s*(тонн[аыу]?|тн|т\b)', 'тонна'),
+    (r'(\d[\d\s.,]*\d?)\s*(вагон\w*)', 'вагон'),
+    (r'(\d[\d\s.,]*\d?)\s*(фур[аыу]\w*|машин[аыу]\w*)', 'фура'),
+    (r'(\d[\d\s.,]*\d?)\s*(м[²2]|кв\.?\s*м\w*)', 'м²'),
+    (r'(\d[\d\s.,]*\d?)\s*(м[³3]|куб\w*)', 'м³'),
+    (r'(\d[\d\s.,]*\d?)\s*(шт|штук\w*)', 'шт'),
+    (r'(\d[\d\s.,]*\d?)\s*(рулон\w*)', 'рулон'),
+    (r'(\d[\d\s.,]*\d?)\s*(лист\w*)', 'лист'),
+    (r'(\d[\d\s.,]*\d?)\s*(поддон\w*|палет\w*)', 'поддон'),
+    (r'(\d[\d\s.,]*\d?)\s*(мешк\w*|мешок)', 'мешок'),
+    (r'(\d[\d\s.,]*\d?)\s*(пач[ек]\w*|пачка)', 'пачка'),
+]]
+
+
 def extract_volume(text: str) -> tuple[float | None, str | None]:
     """Извлекает объём и единицу из текста.
 
@@ -515,21 +567,9 @@ def extract_volume(text: str) -> tuple[float | None, str | None]:
         '500 м²' → (500.0, 'м²')
         '3 фуры' → (3.0, 'фура')
     """
-    VOLUME_PATTERNS = [
-        (r'(\d[\d\s.,]*\d?)\s*(тонн[аыу]?|тн|т\b)', 'тонна'),
-        (r'(\d[\d\s.,]*\d?)\s*(вагон\w*)', 'вагон'),
-        (r'(\d[\d\s.,]*\d?)\s*(фур[аыу]\w*|машин[аыу]\w*)', 'фура'),
-        (r'(\d[\d\s.,]*\d?)\s*(м[²2]|кв\.?\s*м\w*)', 'м²'),
-        (r'(\d[\d\s.,]*\d?)\s*(м[³3]|куб\w*)', 'м³'),
-        (r'(\d[\d\s.,]*\d?)\s*(шт|штук\w*)', 'шт'),
-        (r'(\d[\d\s.,]*\d?)\s*(рулон\w*)', 'рулон'),
-        (r'(\d[\d\s.,]*\d?)\s*(лист\w*)', 'лист'),
-        (r'(\d[\d\s.,]*\d?)\s*(поддон\w*|палет\w*)', 'поддон'),
-        (r'(\d[\d\s.,]*\d?)\s*(мешк\w*|мешок)', 'мешок'),
-        (r'(\d[\d\s.,]*\d?)\s*(пач[ек]\w*|пачка)', 'пачка'),
-    ]
-    for pattern, unit in VOLUME_PATTERNS:
-        match = re.search(pattern, text.lower())
+    text_lower = text.lower()
+    for regex, unit in _VOLUME_REGEXES:
+        match = regex.search(text_lower)
         if match:
             num_str = match.group(1).replace(' ', '').replace(',', '.')
             try:
@@ -548,21 +588,40 @@ _PRODUCT_SYNONYMS = {
     frozenset({'щебень', 'щебёнка'}),
     frozenset({'минвата', 'утеплитель'}),
 }
+# word -> index of its synonym group
+_SYNONYM_GROUP = {
+    word: i for i, group in enumerate(_PRODUCT_SYNONYMS) for word in group
+}
+
+
+# Марки и размеры, вырезаемые при нормализации (применяются по порядку)
+_PRODUCT_NOISE_RES = tuple(re.compile(p) for p in (
+    # Марки: А500С, М500, В25, D500, F150
+    r'[АаAa]\d+[СсCcВвBb]?\d*',
+    r'[МмMm]\d+',
+    r'[ВвBb]\d+',
+    r'[DdДд]\d+',
+    r'[FfФф]\d+',
+    # Размеры: 12мм, 150x150, ∅10
+    r'\d+\s*[хx×]\s*\d+',
+    r'[∅⌀]?\d+\s*мм',
+))
+_WHITESPACE_RE = re.compile(r'\s+')
 
 
 def _normalize_product(product: str) -> str:
     """Нормализация названия продукта для матчинга."""
     text = product.lower().strip()
-    # Убрать марки: А500С, М500, В25, D500, F150
-    text = re.sub(r'[АаAa]\d+[СсCcВвBb]?\d*', '', text)
-    text = re.sub(r'[МмMm]\d+', '', text)
-    text = re.sub(r'[ВвBb]\d+', '', text)
-    text = re.sub(r'[DdДд]\d+', '', text)
-    text = re.sub(r'[FfФф]\d+', '', text)
-    # Убрать размеры: 12мм, 150x150, ∅10
-    text = re.sub(r'\d+\s*[хx×]\s*\d+', '', text)
-    text = re.sub(r'[∅⌀]?\d+\s*мм', '', text)
-    return re.sub(r'\s+', ' ', text).strip()
+    for pattern in _PRODUCT_NOISE_RES:
+        text = pattern.sub('', text)
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+@lru_cache(maxsize=4096)
+def _product_signature(product: str) -> Tuple[str, frozenset]:
+    """Normalized name and its significant tokens (≥4 chars), cached per product string."""
+    normalized = _normalize_product(product)
+    return normalized, frozenset(t for t in normalized.split() if len(t) >= 4)
 
 
 def _products_match(product_a: str, product_b: str) -> bool:
@@ -578,24 +637,22 @@ def _products_match(product_a: str, product_b: str) -> bool:
     if not product_a or not product_b:
         return False
 
-    a = _normalize_product(product_a)
-    b = _normalize_product(product_b)
+    a, tokens_a = _product_signature(product_a)
+    b, tokens_b = _product_signature(product_b)
 
     if a == b:
         return True
 
     # Проверить синонимы
-    for syn_group in _PRODUCT_SYNONYMS:
-        if a in syn_group and b in syn_group:
-            return True
+    group = _SYNONYM_GROUP.get(a)
+    if group is not None and group == _SYNONYM_GROUP.get(b):
+        return True
 
     # Проверить корневое совпадение (первые 4 символа)
     if len(a) >= 4 and len(b) >= 4 and a[:4] == b[:4]:
         return True
 
     # Токенизация
-    tokens_a = {t for t in a.split() if len(t) >= 4}
-    tokens_b = {t for t in b.split() if len(t) >= 4}
     if not tokens_a or not tokens_b:
         return False
 
@@ -613,9 +670,10 @@ async def try_match_orders(db, new_order: Order) -> Optional[DetectedDeal]:
 
     product_name = new_order.product or ""
 
-    # Get active opposite orders
+    # Get active opposite orders; only id + product are needed to pick a match,
+    # the full row is loaded for the matched candidate alone
     result = await db.execute(
-        select(Order).where(
+        select(Order.id, Order.product).where(
             and_(
                 Order.order_type == opposite_type,
                 Order.is_active == True,
@@ -623,19 +681,17 @@ async def try_match_orders(db, new_order: Order) -> Optional[DetectedDeal]:
             )
         ).order_by(Order.created_at.desc()).limit(50)
     )
-    candidates = result.scalars().all()
 
-    for candidate in candidates:
-        candidate_product = candidate.product or ""
-
-        if _products_match(product_name, candidate_product):
+    for candidate_id, candidate_product in result.all():
+        if _products_match(product_name, candidate_product or ""):
+            candidate = await db.get(Order, candidate_id)
             buy_order = new_order if new_order.order_type == OrderType.BUY else candidate
             sell_order = candidate if new_order.order_type == OrderType.BUY else new_order
 
             # Calculate prices and margin
-            buy_price = buy_order.price or Decimal('0')
-            sell_price = sell_order.price or Decimal('0')
-            margin = buy_price - sell_price if buy_price and sell_price else Decimal('0')
+            buy_price = buy_order.price or _ZERO
+            sell_price = sell_order.price or _ZERO
+            margin = buy_price - sell_price if buy_price and sell_price else _ZERO
 
             # Create deal — store regions separately for buyer/seller
             deal = DetectedDeal(
@@ -985,9 +1041,26 @@ async def _resolve_event_text(event, telegram_service) -> tuple[Optional[str], O
         and message.document.mime_type.startswith('audio/')
     ):
         try:
+            from src.services.transcriber import is_silent_voice, transcribe_voice
+
+            # Skip download and Whisper call for accidental taps / silence.
+            # Only voice notes: plain audio files carry no waveform and often
+            # report duration=0 when the sender could not read the metadata.
+            audio_attr = next(
+                (a for a in getattr(message.document, 'attributes', None) or []
+                 if isinstance(a, DocumentAttributeAudio)),
+                None,
+            )
+            if (
+                audio_attr
+                and audio_attr.voice
+                and is_silent_voice(audio_attr.duration, audio_attr.waveform)
+            ):
+                logger.info("Voice message skipped: too short or silent")
+                return ("[голосовое сообщение]", None, None)
+
             audio_bytes = await telegram_service.client.download_media(message, bytes)
             if audio_bytes:
-                from src.services.transcriber import transcribe_voice
                 mime = getattr(message.document, 'mime_type', 'audio/ogg') if message.document else 'audio/ogg'
                 ext = mime.split('/')[-1] if '/' in mime else 'ogg'
                 transcribed = await transcribe_voice(audio_bytes, f"voice.{ext}")
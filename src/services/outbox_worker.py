@@ -9,47 +9,96 @@ import asyncio
 import logging
 import os
 import random
-from datetime import datetime, timezone
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 
-from sqlalchemy import select
+from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from telethon.errors import FloodWaitError
 
 from src.db import get_db_context
-from src.models import OutboxMessage, OutboxStatus, NegotiationMessage, MessageRole
+from src.models import OutboxMessage, OutboxStatus, NegotiationMessage
+from src.services.rate_limiter import RateLimiter
 from src.services.telegram_client import get_telegram_service
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of messages claimed per worker iteration
+OUTBOX_BATCH_SIZE = 10
 
-def calculate_typing_delay(text: str) -> float:
+# Maximum number of recipients served concurrently
+OUTBOX_CONCURRENCY = 8
+
+# Telegram limits: ~30 messages/s per account, ~1 message/s per chat
+_global_limiter = RateLimiter(30, 1.0)
+_chat_limiters: OrderedDict[int, RateLimiter] = OrderedDict()
+_CHAT_LIMITERS_MAX = 4096
+
+# SENDING rows claimed longer ago than this are considered abandoned
+# by a crashed worker (or a DB error mid-batch) and are returned to PENDING;
+# the worker checks for them on startup and once per timeout period after
+STUCK_SENDING_TIMEOUT = timedelta(minutes=5)
+
+
+def calculate_typing_delay(text: str, seed: int | None = None) -> float:
     """
     Calculate realistic typing delay based on message length.
     Simulates human typing speed (about 40-60 chars per second with pauses).
+
+    The delay is deterministic: the same text and seed (outbox message ID)
+    always produce the same value. Without a seed, the text length is used.
     """
     char_count = len(text)
+    rng = random.Random(seed if seed is not None else char_count)
     # Base delay: 1-2 seconds for short messages
     # Plus ~0.05-0.1 seconds per character (simulating ~10-20 chars/sec typing)
-    base_delay = random.uniform(1.0, 2.5)
-    char_delay = char_count * random.uniform(0.03, 0.07)
+    base_delay = rng.uniform(1.0, 2.5)
+    char_delay = char_count * rng.uniform(0.03, 0.07)
     total = base_delay + char_delay
-    # Cap at 8 seconds max
-    return min(total, 8.0)
+    # Cap at 4 seconds: stays within one Telegram typing action (~5s)
+    # and longer pauses add latency without making the reply look more human
+    return min(total, 4.0)
+
+
+def _chat_limiter(recipient_id: int) -> RateLimiter:
+    """Get (or create) the per-chat rate limiter for a recipient (LRU)."""
+    limiter = _chat_limiters.get(recipient_id)
+    if limiter is not None:
+        _chat_limiters.move_to_end(recipient_id)
+        return limiter
+    limiter = _chat_limiters[recipient_id] = RateLimiter(1, 1.0)
+    if len(_chat_limiters) > _CHAT_LIMITERS_MAX:
+        # Only the least recently used bucket goes; chats being sent to keep theirs
+        _chat_limiters.popitem(last=False)
+    return limiter
 
 
 async def process_outbox_message(
     message: OutboxMessage,
-    db: AsyncSession,
-) -> bool:
+    show_typing: bool = True,
+) -> Optional[int]:
     """
     Process a single outbox message.
 
+    Only updates the message's status fields in memory; the caller
+    persists them. A message that could not be attempted (no Telegram
+    service, FloodWait) is released back to PENDING for a later retry.
+
+    Args:
+        message: Claimed outbox message
+        show_typing: Simulate typing before a text message
+
     Returns:
-        True if message was sent successfully
+        Telegram message ID if the message was sent, None otherwise
     """
     telegram = get_telegram_service()
     if not telegram:
         logger.warning("Telegram service not available")
-        return False
+        # Release the claim so the message is retried on the next iteration
+        _release_claim(message)
+        return None
 
     try:
         sent_msg_id = None
@@ -62,9 +111,11 @@ async def process_outbox_message(
                 message.status = OutboxStatus.FAILED
                 message.error_message = "Temp file not found (may have been lost during redeploy)"
                 logger.error(f"Outbox message {message.id}: temp file missing: {message.media_file_path}")
-                return False
+                return None
 
             force_document = message.media_type == "document"
+            await _global_limiter.acquire()
+            await _chat_limiter(message.recipient_id).acquire()
             sent_msg_id = await telegram.send_file(
                 message.recipient_id,
                 message.media_file_path,
@@ -77,9 +128,14 @@ async def process_outbox_message(
             if not message.message_text:
                 message.status = OutboxStatus.FAILED
                 message.error_message = "No message text and no media"
-                return False
+                return None
 
-            typing_delay = calculate_typing_delay(message.message_text)
+            typing_delay = (
+                calculate_typing_delay(message.message_text, seed=message.id)
+                if show_typing else 0
+            )
+            await _global_limiter.acquire()
+            await _chat_limiter(message.recipient_id).acquire()
             sent_msg_id = await telegram.send_message(
                 message.recipient_id,
                 message.message_text,
@@ -89,60 +145,29 @@ async def process_outbox_message(
 
         if sent_msg_id:
             message.status = OutboxStatus.SENT
-            message.sent_at = datetime.now(timezone.utc)
             logger.info(f"Outbox message {message.id} sent successfully (tg_msg_id={sent_msg_id})")
-
-            # Save Telegram message ID to NegotiationMessage for reply tracking
-            if message.negotiation_id and sent_msg_id:
-                try:
-                    if message.media_type:
-                        # Media message: match by role + media_type + no tg_msg_id
-                        result = await db.execute(
-                            select(NegotiationMessage)
-                            .where(
-                                NegotiationMessage.negotiation_id == message.negotiation_id,
-                                NegotiationMessage.role == MessageRole.MANAGER,
-                                NegotiationMessage.media_type == message.media_type,
-                                NegotiationMessage.telegram_message_id.is_(None),
-                            )
-                            .order_by(NegotiationMessage.created_at.desc())
-                            .limit(1)
-                        )
-                    else:
-                        # Text message: match by content
-                        result = await db.execute(
-                            select(NegotiationMessage)
-                            .where(
-                                NegotiationMessage.negotiation_id == message.negotiation_id,
-                                NegotiationMessage.role.in_([MessageRole.AI, MessageRole.MANAGER]),
-                                NegotiationMessage.content == message.message_text,
-                                NegotiationMessage.telegram_message_id.is_(None),
-                            )
-                            .order_by(NegotiationMessage.created_at.desc())
-                            .limit(1)
-                        )
-                    neg_msg = result.scalar_one_or_none()
-                    if neg_msg:
-                        neg_msg.telegram_message_id = sent_msg_id
-                        logger.info(f"Saved tg_msg_id={sent_msg_id} to NegotiationMessage #{neg_msg.id}")
-                except Exception as e:
-                    logger.warning(f"Failed to save telegram_message_id: {e}")
         else:
             message.status = OutboxStatus.FAILED
             message.error_message = "Failed to send via Telegram"
             logger.error(f"Outbox message {message.id} failed to send")
 
-        return bool(sent_msg_id)
+        return sent_msg_id or None
+
+    except FloodWaitError:
+        # The client has paused all sends; retry once the pause is over
+        _release_claim(message)
+        logger.warning(f"Outbox message {message.id} hit FloodWait, released for retry")
+        return None
 
     except Exception as e:
         message.status = OutboxStatus.FAILED
         message.error_message = str(e)
         logger.error(f"Outbox message {message.id} error: {e}")
-        return False
+        return None
 
     finally:
-        # Clean up temp file for media messages
-        if message.media_file_path:
+        # Clean up temp file for media messages (a released one still needs it)
+        if message.media_file_path and message.status != OutboxStatus.PENDING:
             try:
                 if os.path.exists(message.media_file_path):
                     os.remove(message.media_file_path)
@@ -151,6 +176,12 @@ async def process_outbox_message(
                 logger.warning(f"Failed to clean up temp file {message.media_file_path}: {e}")
 
 
+def _release_claim(message: OutboxMessage):
+    """Return a claimed message to PENDING so a later iteration retries it."""
+    message.status = OutboxStatus.PENDING
+    message.claimed_at = None
+
+
 async def outbox_worker_iteration(db: AsyncSession) -> int:
     """
     Process one batch of pending outbox messages.
@@ -158,39 +189,165 @@ async def outbox_worker_iteration(db: AsyncSession) -> int:
     Returns:
         Number of messages processed
     """
-    # Get pending messages
-    result = await db.execute(
-        select(OutboxMessage)
+    # Atomically claim a batch: PENDING -> SENDING. SKIP LOCKED lets several
+    # workers run side by side without picking up the same rows.
+    claimable = (
+        select(OutboxMessage.id)
         .where(OutboxMessage.status == OutboxStatus.PENDING)
         .order_by(OutboxMessage.created_at)
-        .limit(10)
+        .limit(OUTBOX_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        update(OutboxMessage)
+        .where(OutboxMessage.id.in_(claimable))
+        .values(status=OutboxStatus.SENDING, claimed_at=func.now())
+        .returning(OutboxMessage)
     )
-    messages = result.scalars().all()
+    messages = sorted(result.scalars().all(), key=lambda m: (m.created_at, m.id))
+
+    # Detach the batch so status changes are not tracked by the ORM;
+    # each message's outcome is written explicitly right after its send.
+    for message in messages:
+        db.expunge(message)
+    await db.commit()
 
     if not messages:
         return 0
 
-    processed = 0
+    # Messages to the same recipient are sent in order, different recipients
+    # are served concurrently; pacing is enforced by the rate limiters.
+    groups: dict[int, list[OutboxMessage]] = defaultdict(list)
     for message in messages:
-        await process_outbox_message(message, db)
-        processed += 1
-        # Small delay between messages to avoid rate limits
-        await asyncio.sleep(1)
+        groups[message.recipient_id].append(message)
 
-    await db.commit()
+    semaphore = asyncio.Semaphore(OUTBOX_CONCURRENCY)
+    tg_id_updates: list[dict] = []
+    results = await asyncio.gather(
+        *(_send_group(group, semaphore, tg_id_updates) for group in groups.values()),
+        return_exceptions=True,
+    )
+
+    processed = 0
+    for result in results:
+        if isinstance(result, BaseException):
+            logger.error(f"Outbox recipient group error: {result}")
+        else:
+            processed += result
+
+    # Save Telegram message IDs to NegotiationMessage for reply tracking,
+    # one bulk UPDATE for the whole batch
+    if tg_id_updates:
+        try:
+            await db.execute(update(NegotiationMessage), tg_id_updates)
+            await db.commit()
+            logger.info(f"Saved {len(tg_id_updates)} tg_msg_ids to NegotiationMessage")
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"Failed to save telegram_message_id: {e}")
+
+    return processed
+
+
+async def _send_group(
+    messages: list[OutboxMessage],
+    semaphore: asyncio.Semaphore,
+    tg_id_updates: list[dict],
+) -> int:
+    """
+    Send messages for a single recipient sequentially in their own DB session.
+
+    Telegram IDs of sent messages that belong to a negotiation are appended
+    to tg_id_updates for the caller to save in bulk.
+
+    Returns:
+        Number of messages processed
+    """
+    processed = 0
+    released = False
+    async with semaphore:
+        async with get_db_context() as db:
+            for i, message in enumerate(messages):
+                if released:
+                    # An earlier message went back to the queue; keep the
+                    # chat's order by releasing the rest of the burst too
+                    _release_claim(message)
+                    sent_msg_id = None
+                else:
+                    # In a burst to one chat only the first message "types";
+                    # the rest follow as soon as the rate limiter allows
+                    sent_msg_id = await process_outbox_message(message, show_typing=i == 0)
+                    released = message.status == OutboxStatus.PENDING
+                if sent_msg_id and message.negotiation_message_id:
+                    tg_id_updates.append({
+                        "id": message.negotiation_message_id,
+                        "telegram_message_id": sent_msg_id,
+                    })
+                # Persist each outcome immediately so a crash mid-batch
+                # never causes already-sent messages to be sent again
+                # sent_at is stamped by the database clock
+                await db.execute(
+                    update(OutboxMessage)
+                    .where(OutboxMessage.id == message.id)
+                    .values(
+                        status=message.status,
+                        error_message=message.error_message,
+                        claimed_at=message.claimed_at,
+                        sent_at=func.now() if message.status == OutboxStatus.SENT else None,
+                    )
+                )
+                await db.commit()
+                processed += 1
     return processed
 
 
+async def recover_stuck_messages(db: AsyncSession) -> int:
+    """
+    Return messages left in SENDING by a crashed worker back to PENDING.
+
+    Returns:
+        Number of messages recovered
+    """
+    cutoff = datetime.now(timezone.utc) - STUCK_SENDING_TIMEOUT
+    result = await db.execute(
+        update(OutboxMessage)
+        .where(
+            OutboxMessage.status == OutboxStatus.SENDING,
+            OutboxMessage.claimed_at < cutoff,
+        )
+        .values(status=OutboxStatus.PENDING, claimed_at=None)
+    )
+    await db.commit()
+    return result.rowcount
+
+
 async def run_outbox_worker(interval_seconds: int = 10):
     """
     Run the outbox worker continuously.
 
+    Messages stuck in SENDING are recovered on startup and then once
+    every STUCK_SENDING_TIMEOUT.
+
     Args:
         interval_seconds: Time between checks for new messages
     """
     logger.info(f"Starting outbox worker (interval: {interval_seconds}s)")
 
+    recovery_period = STUCK_SENDING_TIMEOUT.total_seconds()
+    next_recovery = 0.0
+
     while True:
+        if time.monotonic() >= next_recovery:
+            next_recovery = time.monotonic() + recovery_period
+            try:
+                async with get_db_context() as db:
+                    recovered = await recover_stuck_messages(db)
+                    if recovered:
+                        logger.warning(f"Outbox worker recovered {recovered} stuck messages")
+            except Exception as e:
+                logger.error(f"Outbox recovery error: {e}")
+
         try:
             async with get_db_context() as db:
                 processed = await outbox_worker_iteration(db)
@@ -0,0 +1,47 @@
+"""
+Token-bucket rate limiter for outgoing Telegram traffic.
+
+Telegram allows roughly 30 messages per second per account and about
+one message per second per chat. The outbox worker keeps one global
+limiter plus one limiter per recipient and acquires both before a send.
+"""
+
+import asyncio
+import time
+
+
+class RateLimiter:
+    """
+    Token bucket allowing at most `rate` acquisitions per `period` seconds.
+
+    Acquisition reserves a token immediately (the bucket may go into debt)
+    and then sleeps for however long that debt takes to repay, so concurrent
+    callers are queued fairly without a lock.
+
+    Usage:
+        limiter = RateLimiter(30, 1.0)
+        async with limiter:
+            await send(...)
+    """
+
+    def __init__(self, rate: float, period: float = 1.0):
+        self.rate = rate
+        self.period = period
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        """Take one token, waiting until it becomes available."""
+        now = time.monotonic()
+        refill = (now - self._updated) * self.rate / self.period
+        self._tokens = min(float(self.rate), self._tokens + refill) - 1
+        self._updated = now
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens * self.period / self.rate)
+
+    async def __aenter__(self) -> "RateLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        return None
@@ -4,21 +4,31 @@ Telegram client service using Telethon.
 Handles:
 - Receiving messages from monitored chats
 - Sending messages to sellers
-- Outbox worker for queued messages
+
+Queued outgoing messages are delivered by src.services.outbox_worker,
+which is the single implementation of the outbox send loop.
 """
 
 import asyncio
 import logging
-import random
-from typing import Callable, Optional
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
 
 from telethon import TelegramClient, events
+from telethon.errors import FloodWaitError
 from telethon.sessions import StringSession
 
 from src.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of resolved entities kept in TelegramService._entity_cache
+_ENTITY_CACHE_MAX = 2048
+
+# Maximum number of recent (chat_id, message_id) pairs kept for deduplication
+_SEEN_MAX = 4096
+
 
 class TelegramService:
     """
@@ -31,6 +41,16 @@ class TelegramService:
         await telegram.run()
     """
 
+    __slots__ = (
+        "client",
+        "me",
+        "_message_handlers",
+        "_flood_wait_until",
+        "_entity_cache",
+        "_seen_msg_ids",
+        "_ack_tasks",
+    )
+
     def __init__(self):
         """Initialize the Telegram client."""
         logger.info(f"Initializing Telegram client...")
@@ -38,6 +58,15 @@ class TelegramService:
         logger.info(f"TG_API_HASH configured: {bool(settings.tg_api_hash)}")
         logger.info(f"TG_SESSION_STRING configured: {bool(settings.tg_session_string)}")
 
+        # Monotonic deadline set by FloodWaitError; all sends wait until it passes
+        self._flood_wait_until = 0.0
+        # LRU cache of resolved entities: recipient_id -> entity
+        self._entity_cache: OrderedDict[int, Any] = OrderedDict()
+        # Recently handled incoming messages; Telethon may redeliver on reconnect
+        self._seen_msg_ids: OrderedDict[tuple[int, int], None] = OrderedDict()
+        # In-flight background read acknowledgements
+        self._ack_tasks: set[asyncio.Task] = set()
+
         if not settings.tg_session_string:
             logger.warning("TG_SESSION_STRING not configured, Telegram will be disabled")
             self.client = None
@@ -69,6 +98,8 @@ class TelegramService:
 
     async def stop(self):
         """Disconnect the Telegram client."""
+        for task in list(self._ack_tasks):
+            task.cancel()
         if self.client:
             await self.client.disconnect()
             logger.info("Telegram client disconnected")
@@ -85,6 +116,9 @@ class TelegramService:
 
         @self.client.on(events.NewMessage)
         async def wrapper(event):
+            if self._is_duplicate(event):
+                logger.debug(f"Skipping duplicate message {event.chat_id}/{event.message.id}")
+                return
             try:
                 # Mark incoming message as read
                 try:
@@ -97,6 +131,16 @@ class TelegramService:
 
         self._message_handlers.append(wrapper)
 
+    def _is_duplicate(self, event) -> bool:
+        """Check whether this event was already handled, and remember it if not."""
+        key = (event.chat_id, event.message.id)
+        if key in self._seen_msg_ids:
+            return True
+        self._seen_msg_ids[key] = None
+        while len(self._seen_msg_ids) > _SEEN_MAX:
+            self._seen_msg_ids.popitem(last=False)
+        return False
+
     async def send_message(self, recipient_id: int, text: str, typing_delay: float = 0, reply_to: int | None = None) -> int | None:
         """
         Send a message to a user or chat.
@@ -110,13 +154,18 @@ class TelegramService:
         Returns:
             Telegram message ID if sent successfully, None otherwise.
             For backwards compatibility, truthy (int) means success, falsy (None) means failure.
+
+        Raises:
+            FloodWaitError: Telegram rate-limited the account. All sends are
+                paused first; the message was not sent and should be retried.
         """
         if not self.client:
             logger.warning("Cannot send message: Telegram client not initialized")
             return None
 
+        await self._wait_for_flood()
         try:
-            entity = await self.client.get_entity(recipient_id)
+            entity = await self._resolve_entity(recipient_id)
 
             # Show typing indicator if delay is set
             if typing_delay > 0:
@@ -125,15 +174,16 @@ class TelegramService:
 
             sent_msg = await self.client.send_message(entity, text, reply_to=reply_to)
             # Mark their messages as read so it shows "read" in Telegram
-            try:
-                await self.client.send_read_acknowledge(entity)
-            except Exception:
-                pass  # Non-critical, don't fail the send
+            self._acknowledge_read(entity)
             logger.info(f"Message sent to {recipient_id} (msg_id={sent_msg.id})")
             return sent_msg.id
         except ValueError:
+            self._entity_cache.pop(recipient_id, None)
             logger.error(f"User {recipient_id} not found")
             return None
+        except FloodWaitError as e:
+            self._on_flood_wait(e)
+            raise
         except Exception as e:
             # If send failed and we had reply_to, retry without it
             # (reply_to may reference a message from a different chat context)
@@ -169,13 +219,18 @@ class TelegramService:
 
         Returns:
             Telegram message ID if sent successfully, None otherwise.
+
+        Raises:
+            FloodWaitError: Telegram rate-limited the account. All sends are
+                paused first; the file was not sent and should be retried.
         """
         if not self.client:
             logger.warning("Cannot send file: Telegram client not initialized")
             return None
 
+        await self._wait_for_flood()
         try:
-            entity = await self.client.get_entity(recipient_id)
+            entity = await self._resolve_entity(recipient_id)
             sent_msg = await self.client.send_file(
                 entity,
                 file_path,
@@ -183,15 +238,16 @@ class TelegramService:
                 force_document=force_document,
                 reply_to=reply_to,
             )
-            try:
-                await self.client.send_read_acknowledge(entity)
-            except Exception:
-                pass
+            self._acknowledge_read(entity)
             logger.info(f"File sent to {recipient_id} (msg_id={sent_msg.id})")
             return sent_msg.id
         except ValueError:
+            self._entity_cache.pop(recipient_id, None)
             logger.error(f"User {recipient_id} not found")
             return None
+        except FloodWaitError as e:
+            self._on_flood_wait(e)
+            raise
         except Exception as e:
             # If send failed and we had reply_to, retry without it
             if reply_to:
@@ -216,11 +272,51 @@ class TelegramService:
         if not self.client:
             return None
         try:
-            return await self.client.get_entity(entity_id)
+            return await self._resolve_entity(entity_id)
         except Exception as e:
+            self._entity_cache.pop(entity_id, None)
             logger.error(f"Failed to get entity {entity_id}: {e}")
             return None
 
+    async def _resolve_entity(self, entity_id: int):
+        """Resolve an entity, reusing previously resolved ones (LRU)."""
+        entity = self._entity_cache.get(entity_id)
+        if entity is not None:
+            self._entity_cache.move_to_end(entity_id)
+            return entity
+        entity = await self.client.get_entity(entity_id)
+        self._entity_cache[entity_id] = entity
+        if len(self._entity_cache) > _ENTITY_CACHE_MAX:
+            self._entity_cache.popitem(last=False)
+        return entity
+
+    def _acknowledge_read(self, entity):
+        """
+        Mark the chat as read in the background.
+
+        Non-critical, so the send path does not wait for the round-trip.
+        """
+        task = asyncio.create_task(self.client.send_read_acknowledge(entity))
+        self._ack_tasks.add(task)
+        task.add_done_callback(self._on_ack_done)
+
+    def _on_ack_done(self, task: asyncio.Task):
+        """Forget a finished read acknowledgement and log its failure."""
+        self._ack_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.debug(f"Read acknowledge failed: {task.exception()}")
+
+    async def _wait_for_flood(self):
+        """Sleep until a FloodWait pause imposed by Telegram has expired."""
+        remaining = self._flood_wait_until - time.monotonic()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+
+    def _on_flood_wait(self, e: FloodWaitError):
+        """Pause all sends for the duration requested by Telegram."""
+        self._flood_wait_until = max(self._flood_wait_until, time.monotonic() + e.seconds)
+        logger.warning(f"Telegram FloodWait: pausing all sends for {e.seconds}s")
+
     def is_own_message(self, sender_id: int) -> bool:
         """Check if a message is from our own account."""
         return self.me is not None and sender_id == self.me.id
@@ -1,15 +1,24 @@
 """OpenAI Whisper integration for voice message transcription."""
 
-import io
 import logging
 from typing import Optional
 
 from openai import AsyncOpenAI
+from telethon.utils import decode_waveform
 
 from src.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Telegram reports voice duration in whole seconds; 0 means a sub-second tap
+MIN_VOICE_DURATION = 1
+
+# Share of waveform samples that must be loud enough to count as speech
+MIN_VOICED_RATIO = 0.1
+
+# A waveform sample is "voiced" if it reaches this fraction of the clip's peak
+_VOICED_LEVEL = 0.25
+
 _client: Optional[AsyncOpenAI] = None
 
 
@@ -24,6 +33,34 @@ def _get_client() -> Optional[AsyncOpenAI]:
     return _client
 
 
+def is_silent_voice(duration: Optional[int], waveform: Optional[bytes]) -> bool:
+    """
+    Cheap local check whether a voice clip is not worth sending to Whisper.
+
+    Uses the metadata Telegram attaches to voice notes instead of decoding
+    the audio: the duration and the packed 5-bit amplitude waveform.
+
+    Args:
+        duration: Clip duration in seconds (DocumentAttributeAudio.duration)
+        waveform: Packed waveform (DocumentAttributeAudio.waveform)
+
+    Returns:
+        True if the clip is too short or (almost) silent.
+    """
+    if duration is not None and duration < MIN_VOICE_DURATION:
+        return True
+    if not waveform:
+        return False
+
+    samples = decode_waveform(waveform)
+    peak = max(samples, default=0)
+    if peak == 0:
+        return True
+    threshold = peak * _VOICED_LEVEL
+    voiced = sum(1 for sample in samples if sample >= threshold)
+    return voiced < len(samples) * MIN_VOICED_RATIO
+
+
 async def transcribe_voice(audio_bytes: bytes, filename: str = "voice.ogg") -> Optional[str]:
     """
     Transcribe audio bytes using OpenAI Whisper API.
@@ -42,12 +79,11 @@ async def transcribe_voice(audio_bytes: bytes, filename: str = "voice.ogg") -> O
         return None
 
     try:
-        audio_file = io.BytesIO(audio_bytes)
-        audio_file.name = filename
-
+        # (filename, content) tuple: the bytes go straight into the multipart
+        # body without a BytesIO copy; the filename still drives format detection
         response = await client.audio.transcriptions.create(
             model="whisper-1",
-            file=audio_file,
+            file=(filename, audio_bytes),
             language="ru",
         )
 
@@ -2,11 +2,13 @@
 
 from src.utils.audit import log_action
 from src.utils.masking import mask_sensitive
-from src.utils.password import hash_password, verify_password
+from src.utils.password import ahash_password, averify_password, hash_password, verify_password
 
 __all__ = [
     "hash_password",
     "verify_password",
+    "ahash_password",
+    "averify_password",
     "mask_sensitive",
     "log_action",
 ]
@@ -2,14 +2,33 @@
 Audit logging utilities.
 
 All manager actions must be logged for security.
+
+Inside an HTTP request, AuditMiddleware collects entries from log_action in
+a per-request buffer and writes them with one multi-row INSERT in its own
+transaction once the handler finishes, whether it returned or raised, so
+the audit trail survives even if the business transaction of the request
+is rolled back.
 """
 
-from typing import Any, Optional
+import logging
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
 
+from fastapi import Request, Response
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.middleware.base import BaseHTTPMiddleware
 
+from src.db.session import AsyncSessionLocal
 from src.models.audit import AuditAction, AuditLog
 
+logger = logging.getLogger(__name__)
+
+# Rows pending for the current request; None outside AuditMiddleware
+audit_buffer: ContextVar[Optional[list[dict[str, Any]]]] = ContextVar(
+    "audit_buffer", default=None
+)
+
 
 async def log_action(
     db: AsyncSession,
@@ -33,21 +52,67 @@ async def log_action(
         ip_address: Client IP address
 
     Returns:
-        Created AuditLog entry
+        Created AuditLog entry (transient when buffered by AuditMiddleware)
     """
-    log_entry = AuditLog(
-        user_id=user_id,
-        action=action,
-        target_type=target_type,
-        target_id=target_id,
-        action_metadata=action_metadata,
-        ip_address=ip_address,
-    )
-    db.add(log_entry)
-    # Note: commit should happen in the calling context
+    row = {
+        "user_id": user_id,
+        "action": action,
+        "target_type": target_type,
+        "target_id": target_id,
+        "action_metadata": action_metadata,
+        "ip_address": ip_address,
+    }
+    log_entry = AuditLog(**row)
+
+    buffer = audit_buffer.get()
+    if buffer is not None:
+        buffer.append(row)
+    else:
+        db.add(log_entry)
+        # Note: commit should happen in the calling context
     return log_entry
 
 
+async def flush_audit_buffer(rows: list[dict[str, Any]]) -> None:
+    """
+    Write buffered audit rows with a single INSERT in a separate transaction.
+
+    Failures are logged and swallowed: losing an audit row must not turn a
+    completed request into an error response.
+    """
+    if not rows:
+        return
+    try:
+        async with AsyncSessionLocal() as session:
+            await session.execute(insert(AuditLog), rows)
+            await session.commit()
+    except Exception as e:
+        logger.error(f"Failed to write {len(rows)} audit log entries: {e}")
+
+
+class AuditMiddleware(BaseHTTPMiddleware):
+    """
+    Middleware that batches log_action calls made during a request.
+
+    Entries are flushed once the handler is done, whether it returned
+    (including 4xx responses such as rejected actions) or raised.
+    """
+
+    async def dispatch(
+        self,
+        request: Request,
+        call_next: Callable,
+    ) -> Response:
+        rows: list[dict[str, Any]] = []
+        token = audit_buffer.set(rows)
+        try:
+            return await call_next(request)
+        finally:
+            audit_buffer.reset(token)
+            # Also on exceptions: the business write may already be committed
+            await flush_audit_buffer(rows)
+
+
 def get_client_ip(request) -> Optional[str]:
     """
     Extract client IP from request.
@@ -58,7 +123,7 @@ def get_client_ip(request) -> Optional[str]:
     forwarded_for = request.headers.get("X-Forwarded-For")
     if forwarded_for:
         # First IP in the list is the client
-        return forwarded_for.split(",")[0].strip()
+        return forwarded_for.partition(",")[0].strip()
 
     # Fall back to direct client IP
     if hasattr(request, "client") and request.client:
@@ -7,12 +7,22 @@ to prevent managers from accessing contact information.
 
 Masking happens at the Pydantic serialization level, NOT CSS.
 The masked data never reaches the manager's browser.
+
+If the optional `hyperscan` package is installed, it is used as a
+pre-filter that rejects texts without any sensitive data in a single
+DFA pass; the actual masking always goes through Python `re`.
 """
 
 import hashlib
 import re
+from functools import cache
 from typing import Optional
 
+try:
+    import hyperscan
+except ImportError:  # Optional accelerator, pure-Python path is used instead
+    hyperscan = None
+
 # Phone number patterns (Russian format)
 PHONE_PATTERNS = [
     # +7 (XXX) XXX-XX-XX
@@ -31,10 +41,99 @@ USERNAME_PATTERN = r'@[a-zA-Z][a-zA-Z0-9_]{4,31}'
 # Email pattern
 EMAIL_PATTERN = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
 
-# Compiled patterns for efficiency
-PHONE_REGEX = re.compile('|'.join(PHONE_PATTERNS))
-USERNAME_REGEX = re.compile(USERNAME_PATTERN)
-EMAIL_REGEX = re.compile(EMAIL_PATTERN)
+# All sensitive patterns in one alternation, so mask_sensitive scans the text once.
+# Emails come before usernames so "john@example.com" is masked as a whole email
+# rather than leaving the local part intact and masking "@example" as a username.
+SENSITIVE_REGEX = re.compile(
+    f"(?P<phone>{'|'.join(PHONE_PATTERNS)})"
+    f"|(?P<email>{EMAIL_PATTERN})"
+    f"|(?P<username>{USERNAME_PATTERN})"
+)
+
+# Every pattern requires at least one of these characters
+_SENSITIVE_MARKERS = ('@', '+', '8')
+
+# Python's str \s as an explicit class: Hyperscan's \s is ASCII-only
+_HS_WHITESPACE = (
+    r'[\x{9}-\x{d}\x{1c}-\x{20}\x{85}\x{a0}\x{1680}\x{2000}-\x{200a}'
+    r'\x{2028}\x{2029}\x{202f}\x{205f}\x{3000}'
+)
+
+# Hyperscan's \d is ASCII-only, so texts with other decimal digits skip the pre-filter
+_NON_ASCII_DIGIT_REGEX = re.compile(r'[^\D0-9]')
+
+
+@cache
+def _hyperscan_database():
+    """
+    Compile all sensitive patterns into one Hyperscan database, or None.
+
+    Built on first use, so processes that never mask text skip the compile.
+    """
+    if hyperscan is None:
+        return None
+    patterns = [
+        p.replace(r'[\s\-]', _HS_WHITESPACE + r'\-]').replace(r'\s', _HS_WHITESPACE + ']')
+        for p in (*PHONE_PATTERNS, USERNAME_PATTERN, EMAIL_PATTERN)
+    ]
+    flags = hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_SINGLEMATCH
+    database = hyperscan.Database()
+    database.compile(
+        expressions=[p.encode() for p in patterns],
+        ids=list(range(len(patterns))),
+        elements=len(patterns),
+        flags=[flags] * len(patterns),
+    )
+    return database
+
+
+def _stop_scan(*_args) -> bool:
+    """Hyperscan match callback: the first hit is enough."""
+    return True
+
+
+def _may_contain_sensitive(text: str) -> bool:
+    """
+    Cheap check whether text can contain a phone, username or email.
+
+    False means none of the patterns can match; True means the regex
+    pass is needed.
+    """
+    if not any(marker in text for marker in _SENSITIVE_MARKERS):
+        return False
+    database = _hyperscan_database()
+    if database is None or _NON_ASCII_DIGIT_REGEX.search(text):
+        return True
+    try:
+        data = text.encode('utf-8')
+    except UnicodeEncodeError:
+        # Lone surrogates (seen in Telegram text) are not valid UTF-8 for
+        # Hyperscan; leave such texts to the regex pass
+        return True
+    try:
+        database.scan(data, match_event_handler=_stop_scan)
+    except hyperscan.ScanTerminated:
+        return True
+    return False
+
+
+class _NonDigitDeleter(dict):
+    """
+    str.translate table that deletes every non-digit character.
+
+    Same result as stripping with the regex \\D: characters outside the
+    precomputed ASCII range are classified on first sight and memoised.
+    """
+
+    def __missing__(self, codepoint: int) -> Optional[int]:
+        value = codepoint if chr(codepoint).isdecimal() else None
+        self[codepoint] = value
+        return value
+
+
+_NON_DIGIT = _NonDigitDeleter(
+    (c, c if chr(c).isdecimal() else None) for c in range(128)
+)
 
 
 def mask_phone(phone: str) -> str:
@@ -46,7 +145,7 @@ def mask_phone(phone: str) -> str:
         89991234567 -> 8***-***-**-**
     """
     # Extract only digits
-    digits = re.sub(r'\D', '', phone)
+    digits = phone.translate(_NON_DIGIT)
 
     if len(digits) >= 11:
         # Russian phone format
@@ -112,18 +211,21 @@ def mask_sensitive(text: str, role: str) -> str:
     if role == "owner":
         return text
 
-    result = text
-
-    # Mask phone numbers
-    result = PHONE_REGEX.sub(lambda m: mask_phone(m.group()), result)
+    # Fast path: most messages contain no possible phone, username or email
+    if not _may_contain_sensitive(text):
+        return text
 
-    # Mask usernames
-    result = USERNAME_REGEX.sub(lambda m: mask_username(m.group()), result)
+    return SENSITIVE_REGEX.sub(_mask_match, text)
 
-    # Mask emails
-    result = EMAIL_REGEX.sub(lambda m: mask_email(m.group()), result)
 
-    return result
+def _mask_match(match: re.Match) -> str:
+    """Mask a SENSITIVE_REGEX match according to which pattern matched."""
+    kind = match.lastgroup
+    if kind == "phone":
+        return mask_phone(match.group())
+    if kind == "email":
+        return mask_email(match.group())
+    return mask_username(match.group())
 
 
 def generate_contact_ref(sender_id: int, chat_id: int) -> str:
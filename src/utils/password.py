@@ -1,13 +1,22 @@
 """
 Password hashing utilities using bcrypt.
+
+bcrypt is deliberately slow (~250ms at the default cost), so async request
+handlers should use the `a`-prefixed variants, which run it in a worker
+thread instead of blocking the event loop.
 """
 
+import asyncio
+
 from passlib.context import CryptContext
 
+from src.config import settings
+
 # Configure bcrypt for password hashing
 pwd_context = CryptContext(
     schemes=["bcrypt"],
     deprecated="auto",
+    bcrypt__rounds=settings.bcrypt_rounds,
 )
 
 
@@ -36,3 +45,13 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         True if password matches, False otherwise
     """
     return pwd_context.verify(plain_password, hashed_password)
+
+
+async def ahash_password(password: str) -> str:
+    """Hash a password in a worker thread (see hash_password)."""
+    return await asyncio.to_thread(hash_password, password)
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in a worker thread (see verify_password)."""
+    return await asyncio.to_thread(verify_password, plain_password, hashed_password)
@@ -7,19 +7,14 @@ Tests for AI Copilot (Section 4):
 - initiate_negotiation branches on ai_mode
 """
 
-import os
 import json
 from decimal import Decimal
 from types import SimpleNamespace
-from unittest.mock import AsyncMock, patch
 
 import pytest
 
-# Set required env vars before importing src modules
-os.environ.setdefault("TG_API_ID", "0")
-os.environ.setdefault("TG_API_HASH", "test")
-os.environ.setdefault("TG_SESSION_STRING", "test")
-
+from src.models import DetectedDeal, DealStatus, Order, OrderType, SystemSetting
+from src.services import ai_copilot
 from src.services.ai_copilot import get_ai_mode, AICopilot
 from src.services.message_handler import _should_ai_respond, NegotiationStage
 
@@ -34,6 +29,72 @@ def _make_negotiation(stage=NegotiationStage.INITIAL, seller_phone=None, buyer_p
     return SimpleNamespace(stage=stage, deal=deal)
 
 
+async def _mk_deal(db_session, product, buy_price, sell_price, **overrides):
+    """Create a flushed COLD deal with its buy/sell orders; overrides go to DetectedDeal."""
+    buy_order = Order(
+        order_type=OrderType.BUY, chat_id=10, sender_id=10, message_id=10,
+        product=product, price=Decimal(buy_price), raw_text=f"куплю {product}",
+        platform="telegram",
+    )
+    sell_order = Order(
+        order_type=OrderType.SELL, chat_id=20, sender_id=20, message_id=20,
+        product=product, price=Decimal(sell_price), raw_text=f"продам {product}",
+        platform="telegram",
+    )
+    fields = {
+        "product": product,
+        "buy_price": Decimal(buy_price),
+        "sell_price": Decimal(sell_price),
+        "margin": Decimal(buy_price) - Decimal(sell_price),
+        "status": DealStatus.COLD,
+        "lead_source": "system",
+        "deal_model": "agency",
+        "buyer_payment_status": "pending",
+        "seller_payment_status": "pending",
+        "our_commission_status": "pending",
+        "platform": "telegram",
+    }
+    fields.update(overrides)
+    deal = DetectedDeal(buy_order=buy_order, sell_order=sell_order, **fields)
+    # One flush inserts both orders and then the deal referencing them
+    db_session.add_all([buy_order, sell_order, deal])
+    await db_session.flush()
+    return deal
+
+
+async def _fake_initial_message(role, product, *args, **kwargs):
+    """Deterministic stand-in for llm.generate_initial_message."""
+    return f"привет, {product} ещё есть?"
+
+
+@pytest.fixture(autouse=True, scope="module")
+def _stub_llm():
+    """Replace the LLM call once for the whole module."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("src.services.llm.generate_initial_message", _fake_initial_message)
+        yield
+
+
+@pytest.fixture(autouse=True)
+def _clear_market_context():
+    """Each test sees its own rows, not a context cached by a previous one."""
+    ai_copilot._market_context_cache.clear()
+    yield
+    ai_copilot._market_context_cache.clear()
+
+
+@pytest.fixture(scope="module")
+def copilot():
+    """AICopilot is stateless; one instance serves the whole module."""
+    return AICopilot()
+
+
+@pytest.fixture
+def copilot_mode(db_session):
+    """Switch ai_mode to copilot (flushed together with the test's rows)."""
+    db_session.add(SystemSetting(key="ai_mode", value={"v": "copilot"}))
+
+
 # =====================================================
 # Tests: _should_ai_respond with ai_mode
 # =====================================================
@@ -87,7 +148,6 @@ class TestGetAiMode:
     @pytest.mark.asyncio
     async def test_explicit_autopilot(self, db_session):
         """When ai_mode is set to 'autopilot', return that."""
-        from src.models import SystemSetting
         setting = SystemSetting(key="ai_mode", value={"v": "autopilot"})
         db_session.add(setting)
         await db_session.flush()
@@ -98,7 +158,6 @@ class TestGetAiMode:
     @pytest.mark.asyncio
     async def test_explicit_copilot(self, db_session):
         """When ai_mode is set to 'copilot', return that."""
-        from src.models import SystemSetting
         setting = SystemSetting(key="ai_mode", value={"v": "copilot"})
         db_session.add(setting)
         await db_session.flush()
@@ -109,7 +168,6 @@ class TestGetAiMode:
     @pytest.mark.asyncio
     async def test_invalid_value_defaults_copilot(self, db_session):
         """Unknown ai_mode value should default to 'copilot'."""
-        from src.models import SystemSetting
         setting = SystemSetting(key="ai_mode", value={"v": "unknown_mode"})
         db_session.add(setting)
         await db_session.flush()
@@ -124,21 +182,18 @@ class TestGetAiMode:
 
 class TestBuildMarketContext:
     @pytest.mark.asyncio
-    async def test_no_data_returns_empty(self, db_session):
+    async def test_no_data_returns_empty(self, db_session, copilot):
         """With no orders in DB, return empty context."""
-        copilot = AICopilot()
         ctx = await copilot.build_market_context("арматура", "стройматериалы", db_session)
         assert ctx["sources_count"] == 0
         assert ctx["avg_price"] is None
 
     @pytest.mark.asyncio
-    async def test_with_orders(self, db_session):
+    async def test_with_orders(self, db_session, copilot):
         """With matching orders, return price statistics."""
-        from src.models import Order, OrderType
-
         # Create some orders with prices
-        for price in [45000, 48000, 50000]:
-            order = Order(
+        db_session.add_all([
+            Order(
                 order_type=OrderType.SELL,
                 chat_id=100,
                 sender_id=200,
@@ -149,16 +204,48 @@ class TestBuildMarketContext:
                 niche="стройматериалы",
                 platform="telegram",
             )
-            db_session.add(order)
+            for price in [45000, 48000, 50000]
+        ])
         await db_session.flush()
 
-        copilot = AICopilot()
         ctx = await copilot.build_market_context("арматура", "стройматериалы", db_session)
         assert ctx["sources_count"] == 3
         assert ctx["min_seen"] == 45000
         assert ctx["max_seen"] == 50000
         assert 47000 <= ctx["avg_price"] <= 48000
 
+    @pytest.mark.asyncio
+    async def test_repeat_call_served_from_cache(self, db_session, copilot):
+        """A second call within the TTL skips the query, even if rows changed."""
+        first = await copilot.build_market_context("арматура", "стройматериалы", db_session)
+        db_session.add(Order(
+            order_type=OrderType.SELL, chat_id=100, sender_id=200, message_id=1,
+            product="арматура а500с", price=Decimal(50000), raw_text="продам арматуру",
+            niche="стройматериалы", platform="telegram",
+        ))
+        await db_session.flush()
+
+        cached = await copilot.build_market_context("арматура", "стройматериалы", db_session)
+        assert cached == first
+        assert cached["sources_count"] == 0
+
+        other_niche = await copilot.build_market_context("арматура", None, db_session)
+        assert other_niche["sources_count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_requeried(self, db_session, copilot, monkeypatch):
+        await copilot.build_market_context("арматура", "стройматериалы", db_session)
+        db_session.add(Order(
+            order_type=OrderType.SELL, chat_id=100, sender_id=200, message_id=1,
+            product="арматура а500с", price=Decimal(50000), raw_text="продам арматуру",
+            niche="стройматериалы", platform="telegram",
+        ))
+        await db_session.flush()
+
+        monkeypatch.setattr(ai_copilot, "_MARKET_CONTEXT_TTL", -1.0)
+        ctx = await copilot.build_market_context("арматура", "стройматериалы", db_session)
+        assert ctx["sources_count"] == 1
+
 
 # =====================================================
 # Tests: AICopilot.recalculate_margin
@@ -166,51 +253,17 @@ class TestBuildMarketContext:
 
 class TestRecalculateMargin:
     @pytest.mark.asyncio
-    async def test_sell_price_change(self, db_session):
+    async def test_sell_price_change(self, db_session, copilot):
         """Recalculate margin when sell price changes."""
-        from src.models import DetectedDeal, DealStatus, Order, OrderType
+        deal = await _mk_deal(db_session, "цемент", "55000", "50000")
 
-        # Create orders first
-        buy_order = Order(
-            order_type=OrderType.BUY, chat_id=1, sender_id=1, message_id=1,
-            product="цемент", price=Decimal("55000"), raw_text="куплю цемент",
-            platform="telegram",
-        )
-        sell_order = Order(
-            order_type=OrderType.SELL, chat_id=2, sender_id=2, message_id=2,
-            product="цемент", price=Decimal("50000"), raw_text="продам цемент",
-            platform="telegram",
-        )
-        db_session.add_all([buy_order, sell_order])
-        await db_session.flush()
-
-        deal = DetectedDeal(
-            buy_order_id=buy_order.id,
-            sell_order_id=sell_order.id,
-            product="цемент",
-            buy_price=Decimal("55000"),
-            sell_price=Decimal("50000"),
-            margin=Decimal("5000"),
-            status=DealStatus.COLD,
-            lead_source="system",
-            deal_model="agency",
-            buyer_payment_status="pending",
-            seller_payment_status="pending",
-            our_commission_status="pending",
-            platform="telegram",
-        )
-        db_session.add(deal)
-        await db_session.flush()
-
-        copilot = AICopilot()
         result = await copilot.recalculate_margin(deal.id, 48000, "sell", db_session)
         assert result["new_margin"] == 7000  # 55000 - 48000
         assert result["old_margin"] == 5000
         assert "выросла" in result["recommendation"]
 
     @pytest.mark.asyncio
-    async def test_deal_not_found(self, db_session):
-        copilot = AICopilot()
+    async def test_deal_not_found(self, db_session, copilot):
         result = await copilot.recalculate_margin(99999, 50000, "sell", db_session)
         assert "error" in result
 
@@ -221,108 +274,35 @@ class TestRecalculateMargin:
 
 class TestInitiateNegotiationCopilot:
     @pytest.mark.asyncio
-    async def test_copilot_generates_draft(self, db_session):
+    async def test_copilot_generates_draft(self, db_session, copilot_mode):
         """In copilot mode, initiate_negotiation should generate a draft, not send."""
-        from src.models import DetectedDeal, DealStatus, Order, OrderType, SystemSetting
-
-        # Set copilot mode
-        setting = SystemSetting(key="ai_mode", value={"v": "copilot"})
-        db_session.add(setting)
-
-        # Create orders
-        buy_order = Order(
-            order_type=OrderType.BUY, chat_id=10, sender_id=10, message_id=10,
-            product="арматура", price=Decimal("52000"), raw_text="куплю арматуру",
-            platform="telegram",
-        )
-        sell_order = Order(
-            order_type=OrderType.SELL, chat_id=20, sender_id=20, message_id=20,
-            product="арматура", price=Decimal("47000"), raw_text="продам арматуру",
-            platform="telegram",
-        )
-        db_session.add_all([buy_order, sell_order])
-        await db_session.flush()
-
-        deal = DetectedDeal(
-            buy_order_id=buy_order.id,
-            sell_order_id=sell_order.id,
-            product="арматура",
-            buy_price=Decimal("52000"),
-            sell_price=Decimal("47000"),
-            margin=Decimal("5000"),
-            status=DealStatus.COLD,
-            buyer_chat_id=10,
-            buyer_sender_id=10,
-            lead_source="system",
-            deal_model="agency",
-            buyer_payment_status="pending",
-            seller_payment_status="pending",
-            our_commission_status="pending",
-            platform="telegram",
+        deal = await _mk_deal(
+            db_session, "арматура", "52000", "47000",
+            buyer_chat_id=10, buyer_sender_id=10,
         )
-        db_session.add(deal)
-        await db_session.flush()
-
-        # Mock LLM to return a draft
-        with patch("src.services.llm.generate_initial_message", new_callable=AsyncMock) as mock_llm:
-            mock_llm.return_value = "привет, арматура ещё актуальна?"
 
-            from src.services.ai_negotiator import initiate_negotiation
-            result = await initiate_negotiation(deal, db_session)
+        from src.services.ai_negotiator import initiate_negotiation
+        result = await initiate_negotiation(deal, db_session)
 
         # Should return None (no Negotiation created)
         assert result is None
         # Draft should be saved as JSON with seller/buyer keys
         assert deal.ai_draft_message is not None
         draft_data = json.loads(deal.ai_draft_message)
-        assert draft_data["seller"] == "привет, арматура ещё актуальна?"
+        assert draft_data["seller"] == "привет, арматура ещё есть?"
         assert "buyer" in draft_data
-        # Market context should be JSON
-        assert deal.market_price_context is not None
-        ctx = json.loads(deal.market_price_context)
-        assert "sources_count" in ctx
+        # Market context is stored as a JSON object
+        assert "sources_count" in deal.market_price_context
         # Status should remain COLD
         assert deal.status == DealStatus.COLD
 
     @pytest.mark.asyncio
-    async def test_copilot_skips_existing_draft(self, db_session):
+    async def test_copilot_skips_existing_draft(self, db_session, copilot_mode):
         """If deal already has a draft, copilot should skip it."""
-        from src.models import DetectedDeal, DealStatus, Order, OrderType, SystemSetting
-
-        setting = SystemSetting(key="ai_mode", value={"v": "copilot"})
-        db_session.add(setting)
-
-        buy_order = Order(
-            order_type=OrderType.BUY, chat_id=10, sender_id=10, message_id=100,
-            product="цемент", price=Decimal("30000"), raw_text="куплю цемент",
-            platform="telegram",
-        )
-        sell_order = Order(
-            order_type=OrderType.SELL, chat_id=20, sender_id=20, message_id=200,
-            product="цемент", price=Decimal("25000"), raw_text="продам цемент",
-            platform="telegram",
-        )
-        db_session.add_all([buy_order, sell_order])
-        await db_session.flush()
-
-        deal = DetectedDeal(
-            buy_order_id=buy_order.id,
-            sell_order_id=sell_order.id,
-            product="цемент",
-            buy_price=Decimal("30000"),
-            sell_price=Decimal("25000"),
-            margin=Decimal("5000"),
-            status=DealStatus.COLD,
+        deal = await _mk_deal(
+            db_session, "цемент", "30000", "25000",
             ai_draft_message="existing draft",
-            lead_source="system",
-            deal_model="agency",
-            buyer_payment_status="pending",
-            seller_payment_status="pending",
-            our_commission_status="pending",
-            platform="telegram",
         )
-        db_session.add(deal)
-        await db_session.flush()
 
         from src.services.ai_negotiator import initiate_negotiation
         result = await initiate_negotiation(deal, db_session)
@@ -333,53 +313,17 @@ class TestInitiateNegotiationCopilot:
     @pytest.mark.asyncio
     async def test_autopilot_creates_negotiation(self, db_session):
         """In autopilot mode, initiate_negotiation should create Negotiation and outbox."""
-        from src.models import (
-            DetectedDeal, DealStatus, Order, OrderType,
-            SystemSetting, Negotiation, OutboxMessage,
-        )
+        from src.models import Negotiation, OutboxMessage
         from sqlalchemy import select
 
-        setting = SystemSetting(key="ai_mode", value={"v": "autopilot"})
-        db_session.add(setting)
-
-        buy_order = Order(
-            order_type=OrderType.BUY, chat_id=30, sender_id=30, message_id=30,
-            product="щебень", price=Decimal("2000"), raw_text="куплю щебень",
-            platform="telegram",
-        )
-        sell_order = Order(
-            order_type=OrderType.SELL, chat_id=40, sender_id=40, message_id=40,
-            product="щебень", price=Decimal("1500"), raw_text="продам щебень",
-            platform="telegram",
+        db_session.add(SystemSetting(key="ai_mode", value={"v": "autopilot"}))
+        deal = await _mk_deal(
+            db_session, "щебень", "2000", "1500",
+            buyer_chat_id=10, buyer_sender_id=10,
         )
-        db_session.add_all([buy_order, sell_order])
-        await db_session.flush()
 
-        deal = DetectedDeal(
-            buy_order_id=buy_order.id,
-            sell_order_id=sell_order.id,
-            product="щебень",
-            buy_price=Decimal("2000"),
-            sell_price=Decimal("1500"),
-            margin=Decimal("500"),
-            status=DealStatus.COLD,
-            buyer_chat_id=30,
-            buyer_sender_id=30,
-            lead_source="system",
-            deal_model="agency",
-            buyer_payment_status="pending",
-            seller_payment_status="pending",
-            our_commission_status="pending",
-            platform="telegram",
-        )
-        db_session.add(deal)
-        await db_session.flush()
-
-        with patch("src.services.llm.generate_initial_message", new_callable=AsyncMock) as mock_llm:
-            mock_llm.return_value = "привет, щебень ещё есть?"
-
-            from src.services.ai_negotiator import initiate_negotiation
-            result = await initiate_negotiation(deal, db_session)
+        from src.services.ai_negotiator import initiate_negotiation
+        result = await initiate_negotiation(deal, db_session)
 
         # Should create Negotiation
         assert result is not None
@@ -10,15 +10,11 @@ Unit tests for AI negotiator improvements:
 - extract_price with dot-separator
 """
 
-import os
 import sys
 from decimal import Decimal
-from types import SimpleNamespace
+from types import MappingProxyType, SimpleNamespace
 
-# Set required env var before importing src modules
-os.environ.setdefault("TG_API_ID", "0")
-os.environ.setdefault("TG_API_HASH", "test")
-os.environ.setdefault("TG_SESSION_STRING", "test")
+import pytest
 
 from src.services.ai_negotiator import (
     analyze_response,
@@ -30,7 +26,11 @@ from src.services.ai_negotiator import (
     build_conversation_summary,
     _detect_unanswered_question,
 )
-from src.services.llm import build_seller_system_prompt, build_buyer_system_prompt
+from src.services.llm import (
+    _build_seller_prompt_parts,
+    build_buyer_system_prompt,
+    build_seller_system_prompt,
+)
 from src.services.message_handler import _products_match, extract_price
 
 
@@ -38,21 +38,22 @@ from src.services.message_handler import _products_match, extract_price
 # Helper: fake deal object
 # =====================================================
 
+_DEAL_DEFAULTS = MappingProxyType({
+    "region": None,
+    "seller_city": None,
+    "seller_condition": None,
+    "seller_specs": None,
+    "sell_price": None,
+    "buy_price": None,
+    "buyer_preferences": None,
+    "sell_order": None,
+    "buy_order": None,
+})
+
+
 def _make_deal(**kwargs):
     """Create a fake deal-like object with given attributes."""
-    defaults = {
-        "region": None,
-        "seller_city": None,
-        "seller_condition": None,
-        "seller_specs": None,
-        "sell_price": None,
-        "buy_price": None,
-        "buyer_preferences": None,
-        "sell_order": None,
-        "buy_order": None,
-    }
-    defaults.update(kwargs)
-    return SimpleNamespace(**defaults)
+    return SimpleNamespace(**{**_DEAL_DEFAULTS, **kwargs})
 
 
 # =====================================================
@@ -60,45 +61,26 @@ def _make_deal(**kwargs):
 # =====================================================
 
 class TestCollectKnownData:
-    def test_seller_with_region(self):
-        deal = _make_deal(region="Москва")
-        known = collect_known_data(deal, "seller")
-        assert known["region"] == "Москва"
-
-    def test_seller_with_city_overrides_region(self):
-        deal = _make_deal(region="МО", seller_city="Москва")
-        known = collect_known_data(deal, "seller")
-        assert known["region"] == "Москва"
-
-    def test_seller_with_condition(self):
-        deal = _make_deal(seller_condition="идеальное, без царапин")
-        known = collect_known_data(deal, "seller")
-        assert "condition" in known
-
-    def test_seller_with_specs(self):
-        deal = _make_deal(seller_specs="256 гб, чёрный")
-        known = collect_known_data(deal, "seller")
-        assert "specs" in known
-
-    def test_seller_with_price(self):
-        deal = _make_deal(sell_price=Decimal("50000"))
-        known = collect_known_data(deal, "seller")
-        assert known["price"] == "50000"
-
-    def test_buyer_with_region(self):
-        deal = _make_deal(region="СПб")
-        known = collect_known_data(deal, "buyer")
-        assert known["region"] == "СПб"
-
-    def test_buyer_with_preferences(self):
-        deal = _make_deal(buyer_preferences="чёрный, 128гб")
-        known = collect_known_data(deal, "buyer")
-        assert known["preferences"] == "чёрный, 128гб"
-
-    def test_buyer_with_budget(self):
-        deal = _make_deal(buy_price=Decimal("60000"))
-        known = collect_known_data(deal, "buyer")
-        assert known["budget"] == "60000"
+    @pytest.mark.parametrize("fields, target, expected", [
+        pytest.param({"region": "Москва"}, "seller", {"region": "Москва"},
+                     id="seller_with_region"),
+        pytest.param({"region": "МО", "seller_city": "Москва"}, "seller", {"region": "Москва"},
+                     id="seller_with_city_overrides_region"),
+        pytest.param({"seller_condition": "идеальное, без царапин"}, "seller",
+                     {"condition": "идеальное, без царапин"}, id="seller_with_condition"),
+        pytest.param({"seller_specs": "256 гб, чёрный"}, "seller", {"specs": "256 гб, чёрный"},
+                     id="seller_with_specs"),
+        pytest.param({"sell_price": Decimal("50000")}, "seller", {"price": "50000"},
+                     id="seller_with_price"),
+        pytest.param({"region": "СПб"}, "buyer", {"region": "СПб"}, id="buyer_with_region"),
+        pytest.param({"buyer_preferences": "чёрный, 128гб"}, "buyer",
+                     {"preferences": "чёрный, 128гб"}, id="buyer_with_preferences"),
+        pytest.param({"buy_price": Decimal("60000")}, "buyer", {"budget": "60000"},
+                     id="buyer_with_budget"),
+    ])
+    def test_known_fields(self, fields, target, expected):
+        known = collect_known_data(_make_deal(**fields), target)
+        assert expected.items() <= known.items()
 
     def test_empty_deal(self):
         deal = _make_deal()
@@ -181,6 +163,36 @@ class TestBuildSellerSystemPrompt:
         prompt = build_seller_system_prompt(known_data={}, missing_fields=[])
         assert "СНАЧАЛА ответь" in prompt or "ответь на него" in prompt
 
+    def test_repeated_inputs_reuse_cached_prompt(self):
+        _build_seller_prompt_parts.cache_clear()
+        first = build_seller_system_prompt(
+            known_data={"region": "Москва", "price": "50000"},
+            missing_fields=["condition"],
+        )
+        second = build_seller_system_prompt(
+            known_data={"price": "50000", "region": "Москва"},
+            missing_fields=["condition"],
+        )
+        other = build_seller_system_prompt(
+            known_data={"region": "Москва", "price": "50000"},
+            missing_fields=["specs"],
+        )
+        assert second == first
+        assert other != first
+        assert _build_seller_prompt_parts.cache_info().hits == 1
+
+    def test_summary_not_part_of_cache_key(self):
+        """Per-turn summaries must not grow the cache or be retained by it."""
+        _build_seller_prompt_parts.cache_clear()
+        for turn in range(5):
+            build_seller_system_prompt(
+                known_data={}, missing_fields=["condition"],
+                conversation_summary=f"{turn}. Ты: привет → Собеседник: да",
+            )
+        info = _build_seller_prompt_parts.cache_info()
+        assert info.currsize == 1
+        assert info.hits == 4
+
 
 # =====================================================
 # Tests: build_buyer_system_prompt
@@ -228,31 +240,23 @@ class TestBuildBuyerSystemPrompt:
 # =====================================================
 
 class TestProductsMatch:
-    def test_same_product(self):
-        assert _products_match("iPhone 15 Pro", "iPhone 15 Pro Max") is True
-
-    def test_different_products(self):
-        assert _products_match("цемент М500", "песок М500") is False
-
-    def test_same_brand_different_model(self):
-        assert _products_match("iPhone 14", "iPhone 15") is True
-
-    def test_same_keyword_long(self):
-        assert _products_match("MacBook Air M2", "MacBook Pro M2") is True
-
-    def test_completely_different(self):
-        assert _products_match("iPhone 15", "бетон М300") is False
-
-    def test_empty_strings(self):
-        assert _products_match("", "iPhone") is False
-        assert _products_match("iPhone", "") is False
-        assert _products_match("", "") is False
-
-    def test_cyrillic_products(self):
-        assert _products_match("кирпич красный", "кирпич белый") is True
-
-    def test_same_construction_material(self):
-        assert _products_match("арматура 12мм", "арматура 16мм") is True
+    @pytest.mark.parametrize("product_a, product_b, expected", [
+        pytest.param("iPhone 15 Pro", "iPhone 15 Pro Max", True, id="same_product"),
+        pytest.param("цемент М500", "песок М500", False, id="different_products"),
+        pytest.param("iPhone 14", "iPhone 15", True, id="same_brand_different_model"),
+        pytest.param("MacBook Air M2", "MacBook Pro M2", True, id="same_keyword_long"),
+        pytest.param("iPhone 15", "бетон М300", False, id="completely_different"),
+        pytest.param("", "iPhone", False, id="empty_first"),
+        pytest.param("iPhone", "", False, id="empty_second"),
+        pytest.param("", "", False, id="both_empty"),
+        pytest.param("кирпич красный", "кирпич белый", True, id="cyrillic_products"),
+        pytest.param("арматура 12мм", "арматура 16мм", True, id="same_construction_material"),
+        pytest.param("Минвата", "утеплитель", True, id="synonyms"),
+        pytest.param("щебень", "щебёнка", True, id="synonyms_different_root"),
+        pytest.param("минвата", "щебень", False, id="different_synonym_groups"),
+    ])
+    def test_match(self, product_a, product_b, expected):
+        assert _products_match(product_a, product_b) is expected
 
 
 # =====================================================
@@ -265,17 +269,13 @@ class TestExtractPreferences:
         assert result is not None
         assert "чёрный" in result
 
-    def test_no_preference(self):
-        result = _extract_preferences_from_text("да, интересно")
-        assert result is None
-
-    def test_size_preference(self):
-        result = _extract_preferences_from_text("нужен размер 42")
-        assert result is not None
-
-    def test_model_preference(self):
-        result = _extract_preferences_from_text("интересует модель Pro Max")
-        assert result is not None
+    @pytest.mark.parametrize("text, found", [
+        pytest.param("да, интересно", False, id="no_preference"),
+        pytest.param("нужен размер 42", True, id="size_preference"),
+        pytest.param("интересует модель Pro Max", True, id="model_preference"),
+    ])
+    def test_detects_preferences(self, text, found):
+        assert (_extract_preferences_from_text(text) is not None) is found
 
 
 # =====================================================
@@ -314,20 +314,15 @@ class TestDetectMissingFieldsBuyer:
 # =====================================================
 
 class TestAnalyzeDiscussedTopics:
-    def test_condition_quality(self):
-        context = [{"role": "seller", "content": "качество отличное, без повреждений"}]
-        discussed = _analyze_discussed_topics(context)
-        assert "condition" in discussed
-
-    def test_city_region(self):
-        context = [{"role": "ai", "content": "а в каком регионе находишься?"}]
-        discussed = _analyze_discussed_topics(context)
-        assert "city" in discussed
-
-    def test_specs_model(self):
-        context = [{"role": "seller", "content": "модель 2024 года, размер XL"}]
-        discussed = _analyze_discussed_topics(context)
-        assert "specs" in discussed
+    @pytest.mark.parametrize("role, content, topic", [
+        pytest.param("seller", "качество отличное, без повреждений", "condition",
+                     id="condition_quality"),
+        pytest.param("ai", "а в каком регионе находишься?", "city", id="city_region"),
+        pytest.param("seller", "модель 2024 года, размер XL", "specs", id="specs_model"),
+    ])
+    def test_topic_detected(self, role, content, topic):
+        discussed = _analyze_discussed_topics([{"role": role, "content": content}])
+        assert topic in discussed
 
 
 # =====================================================
@@ -392,55 +387,40 @@ class TestBuildConversationSummary:
 # =====================================================
 
 class TestDetectUnansweredQuestion:
-    def test_question_mark(self):
-        ctx = [{"role": "seller", "content": "ты бот?"}]
-        assert _detect_unanswered_question(ctx) is not None
-
-    def test_question_keyword(self):
-        ctx = [{"role": "seller", "content": "ты бот что ли"}]
-        result = _detect_unanswered_question(ctx)
-        assert result is not None
-
-    def test_no_question(self):
-        ctx = [{"role": "seller", "content": "да, продаю"}]
-        assert _detect_unanswered_question(ctx) is None
-
-    def test_ai_last_message(self):
-        ctx = [{"role": "ai", "content": "как дела?"}]
-        assert _detect_unanswered_question(ctx) is None
+    @pytest.mark.parametrize("role, content, unanswered", [
+        pytest.param("seller", "ты бот?", True, id="question_mark"),
+        pytest.param("seller", "ты бот что ли", True, id="question_keyword"),
+        pytest.param("seller", "да, продаю", False, id="no_question"),
+        pytest.param("ai", "как дела?", False, id="ai_last_message"),
+        pytest.param("buyer", "а почему так дорого", True, id="why_question"),
+    ])
+    def test_detect(self, role, content, unanswered):
+        ctx = [{"role": role, "content": content}]
+        assert (_detect_unanswered_question(ctx) is not None) is unanswered
 
     def test_empty_context(self):
         assert _detect_unanswered_question([]) is None
 
-    def test_why_question(self):
-        ctx = [{"role": "buyer", "content": "а почему так дорого"}]
-        result = _detect_unanswered_question(ctx)
-        assert result is not None
-
 
 # =====================================================
 # Tests: extract_price with dot-separator
 # =====================================================
 
 class TestExtractPriceDotSeparator:
-    def test_130_000(self):
-        assert extract_price("бюджет 130.000") == Decimal("130000")
-
-    def test_1_500_000(self):
-        assert extract_price("цена 1.500.000") == Decimal("1500000")
-
-    def test_50_000(self):
-        assert extract_price("отдам за 50.000") == Decimal("50000")
-
-    def test_regular_130k(self):
-        assert extract_price("130к") == Decimal("130000")
-
-    def test_regular_50000(self):
-        assert extract_price("цена 50000") == Decimal("50000")
-
-    def test_small_decimal_not_price(self):
+    @pytest.mark.parametrize("text, expected", [
+        pytest.param("бюджет 130.000", Decimal("130000"), id="130_000"),
+        pytest.param("цена 1.500.000", Decimal("1500000"), id="1_500_000"),
+        pytest.param("отдам за 50.000", Decimal("50000"), id="50_000"),
+        pytest.param("130к", Decimal("130000"), id="regular_130k"),
+        pytest.param("цена 50000", Decimal("50000"), id="regular_50000"),
         # "3.5" should not be a valid price (too small)
-        assert extract_price("3.5 кг") is None
+        pytest.param("3.5 кг", None, id="small_decimal_not_price"),
+        pytest.param("цена договорная, пишите в лс", None, id="no_digits"),
+        # "за 50" is below the price range, so the next match wins
+        pytest.param("за 50 руб, всего 3 тыс", Decimal("3000"), id="out_of_range_skipped"),
+    ])
+    def test_extract(self, text, expected):
+        assert extract_price(text) == expected
 
 
 # =====================================================
@@ -0,0 +1,182 @@
+"""
+Tests for audit logging and per-request batching.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from src.models import User, UserRole
+from src.models.audit import AuditAction, AuditLog
+from src.utils import audit
+from src.utils.audit import (
+    AuditMiddleware,
+    audit_buffer,
+    flush_audit_buffer,
+    get_client_ip,
+    log_action,
+)
+
+
+async def _create_user(db_session) -> User:
+    user = User(
+        username="manager1",
+        password_hash="x",
+        role=UserRole.MANAGER,
+        display_name="Manager",
+        is_active=True,
+    )
+    db_session.add(user)
+    await db_session.commit()
+    return user
+
+
+class TestLogAction:
+    """log_action without and with a request buffer."""
+
+    @pytest.mark.asyncio
+    async def test_adds_to_session_outside_request(self, db_session):
+        user = await _create_user(db_session)
+
+        await log_action(db=db_session, user_id=user.id, action=AuditAction.LOGIN)
+        await db_session.commit()
+
+        count = await db_session.scalar(select(func.count()).select_from(AuditLog))
+        assert count == 1
+
+    @pytest.mark.asyncio
+    async def test_buffers_inside_request(self, db_session):
+        user = await _create_user(db_session)
+        rows: list = []
+        token = audit_buffer.set(rows)
+        try:
+            entry = await log_action(
+                db=db_session,
+                user_id=user.id,
+                action=AuditAction.VIEW_DEAL,
+                target_type="deal",
+                target_id=7,
+            )
+        finally:
+            audit_buffer.reset(token)
+
+        assert entry not in db_session.new
+        assert rows == [{
+            "user_id": user.id,
+            "action": AuditAction.VIEW_DEAL,
+            "target_type": "deal",
+            "target_id": 7,
+            "action_metadata": None,
+            "ip_address": None,
+        }]
+
+
+class TestFlushAuditBuffer:
+    """Buffered rows are written in their own transaction."""
+
+    @pytest.mark.asyncio
+    async def test_writes_all_rows(self, db_session_factory, db_session):
+        user = await _create_user(db_session)
+        rows = [
+            {"user_id": user.id, "action": AuditAction.LOGIN, "target_type": None,
+             "target_id": None, "action_metadata": None, "ip_address": "1.2.3.4"},
+            {"user_id": user.id, "action": AuditAction.TAKE_DEAL, "target_type": "deal",
+             "target_id": 3, "action_metadata": {"k": "v"}, "ip_address": None},
+        ]
+
+        with patch.object(audit, "AsyncSessionLocal", db_session_factory):
+            await flush_audit_buffer(rows)
+
+        result = await db_session.execute(select(AuditLog).order_by(AuditLog.id))
+        logs = result.scalars().all()
+        assert [log.action for log in logs] == [AuditAction.LOGIN, AuditAction.TAKE_DEAL]
+        assert logs[1].action_metadata == {"k": "v"}
+
+    @pytest.mark.asyncio
+    async def test_errors_are_swallowed(self):
+        def broken_factory():
+            raise RuntimeError("db down")
+
+        with patch.object(audit, "AsyncSessionLocal", broken_factory):
+            await flush_audit_buffer([{"user_id": 1, "action": AuditAction.LOGIN}])
+
+
+class TestAuditMiddleware:
+    """Middleware collects rows per request and flushes them once."""
+
+    def _client(self, flushed: list, monkeypatch) -> TestClient:
+        app = FastAPI()
+        app.add_middleware(AuditMiddleware)
+
+        @app.get("/ok")
+        async def ok():
+            await log_action(db=None, user_id=1, action=AuditAction.VIEW_DEAL)
+            await log_action(db=None, user_id=1, action=AuditAction.TAKE_DEAL)
+            return {"ok": True}
+
+        @app.get("/denied")
+        async def denied():
+            await log_action(db=None, user_id=1, action=AuditAction.LOGIN)
+            raise HTTPException(status_code=403)
+
+        @app.get("/boom")
+        async def boom():
+            await log_action(db=None, user_id=1, action=AuditAction.UPDATE_DEAL)
+            raise RuntimeError("refresh failed after commit")
+
+        async def fake_flush(rows):
+            flushed.append(list(rows))
+
+        monkeypatch.setattr(audit, "flush_audit_buffer", fake_flush)
+        return TestClient(app)
+
+    def test_single_flush_per_request(self, monkeypatch):
+        flushed: list = []
+        client = self._client(flushed, monkeypatch)
+
+        assert client.get("/ok").status_code == 200
+        assert len(flushed) == 1
+        assert [row["action"] for row in flushed[0]] == [
+            AuditAction.VIEW_DEAL,
+            AuditAction.TAKE_DEAL,
+        ]
+        assert audit_buffer.get() is None
+
+    def test_http_errors_still_flush(self, monkeypatch):
+        flushed: list = []
+        client = self._client(flushed, monkeypatch)
+
+        assert client.get("/denied").status_code == 403
+        assert [row["action"] for row in flushed[0]] == [AuditAction.LOGIN]
+
+    def test_unhandled_exception_still_flushes(self, monkeypatch):
+        flushed: list = []
+        client = self._client(flushed, monkeypatch)
+
+        with pytest.raises(RuntimeError):
+            client.get("/boom")
+        assert [row["action"] for row in flushed[0]] == [AuditAction.UPDATE_DEAL]
+        assert audit_buffer.get() is None
+
+
+class TestGetClientIp:
+    """Client IP extraction behind proxies."""
+
+    def _request(self, headers=None, host=None):
+        client = SimpleNamespace(host=host) if host else None
+        return SimpleNamespace(headers=headers or {}, client=client)
+
+    def test_first_forwarded_address(self):
+        request = self._request({"X-Forwarded-For": " 10.0.0.1 , 172.16.0.2"})
+        assert get_client_ip(request) == "10.0.0.1"
+
+    def test_single_forwarded_address(self):
+        assert get_client_ip(self._request({"X-Forwarded-For": "10.0.0.1"})) == "10.0.0.1"
+
+    def test_falls_back_to_client_host(self):
+        assert get_client_ip(self._request(host="127.0.0.1")) == "127.0.0.1"
+        assert get_client_ip(self._request()) is None
@@ -7,60 +7,55 @@ Covers:
 - Commission integration in deal closing (ledger fields)
 """
 
-import os
+from dataclasses import dataclass
 from decimal import Decimal
-from types import SimpleNamespace
+from typing import Optional
 
-os.environ.setdefault("TG_API_ID", "0")
-os.environ.setdefault("TG_API_HASH", "test")
-os.environ.setdefault("TG_SESSION_STRING", "test")
+import pytest
 
 from src.services.commission import (
+    calculate_commission,
     calculate_commission_rate,
     SYSTEM_LEAD_RATE,
     MANAGER_LEAD_RATE,
 )
 
 
+@dataclass(slots=True)
+class _DealStub:
+    """The DetectedDeal fields calculate_commission_rate reads."""
+    lead_source: str = "system"
+
+
+@dataclass(slots=True)
+class _ManagerStub:
+    """The User fields calculate_commission_rate reads."""
+    commission_rate: Optional[Decimal] = Decimal("0.10")
+
+
 def _make_deal(**kwargs):
-    defaults = {"lead_source": "system"}
-    defaults.update(kwargs)
-    return SimpleNamespace(**defaults)
+    return _DealStub(**kwargs)
 
 
 def _make_manager(**kwargs):
-    defaults = {"commission_rate": Decimal("0.10")}
-    defaults.update(kwargs)
-    return SimpleNamespace(**defaults)
+    return _ManagerStub(**kwargs)
 
 
 # ── calculate_commission_rate ─────────────────────────────
 
 
 class TestCalculateCommissionRate:
-    def test_system_lead_default_rate(self):
-        deal = _make_deal(lead_source="system")
-        manager = _make_manager()
-        rate = calculate_commission_rate(deal, manager)
-        assert rate == SYSTEM_LEAD_RATE  # 0.20
-
-    def test_manager_lead_default_rate(self):
-        deal = _make_deal(lead_source="manager")
-        manager = _make_manager()
-        rate = calculate_commission_rate(deal, manager)
-        assert rate == MANAGER_LEAD_RATE  # 0.35
-
-    def test_custom_rate_overrides_system(self):
-        deal = _make_deal(lead_source="system")
-        manager = _make_manager(commission_rate=Decimal("0.25"))
-        rate = calculate_commission_rate(deal, manager)
-        assert rate == Decimal("0.25")
-
-    def test_custom_rate_overrides_manager_lead(self):
-        deal = _make_deal(lead_source="manager")
-        manager = _make_manager(commission_rate=Decimal("0.40"))
-        rate = calculate_commission_rate(deal, manager)
-        assert rate == Decimal("0.40")
+    @pytest.mark.parametrize("lead_source, commission_rate, expected", [
+        pytest.param("system", Decimal("0.10"), SYSTEM_LEAD_RATE, id="system_lead_default_rate"),
+        pytest.param("manager", Decimal("0.10"), MANAGER_LEAD_RATE, id="manager_lead_default_rate"),
+        pytest.param("system", Decimal("0.25"), Decimal("0.25"), id="custom_rate_overrides_system"),
+        pytest.param("manager", Decimal("0.40"), Decimal("0.40"), id="custom_rate_overrides_manager_lead"),
+        pytest.param("manager", None, MANAGER_LEAD_RATE, id="none_commission_uses_tier"),
+    ])
+    def test_rate(self, lead_source, commission_rate, expected):
+        deal = _make_deal(lead_source=lead_source)
+        manager = _make_manager(commission_rate=commission_rate)
+        assert calculate_commission_rate(deal, manager) == expected
 
     def test_old_default_010_not_treated_as_custom(self):
         """0.10 is the legacy default — should NOT override the tier rate."""
@@ -69,12 +64,6 @@ class TestCalculateCommissionRate:
         rate = calculate_commission_rate(deal, manager)
         assert rate == SYSTEM_LEAD_RATE  # 0.20, not 0.10
 
-    def test_none_commission_uses_tier(self):
-        deal = _make_deal(lead_source="manager")
-        manager = _make_manager(commission_rate=None)
-        rate = calculate_commission_rate(deal, manager)
-        assert rate == MANAGER_LEAD_RATE  # 0.35
-
     def test_rate_is_decimal(self):
         deal = _make_deal(lead_source="system")
         manager = _make_manager()
@@ -102,3 +91,13 @@ class TestCommissionMath:
         margin = Decimal("100000")
         rate = Decimal("0.25")
         assert margin * rate == Decimal("25000.00")
+
+    def test_calculate_commission_rounds_to_kopecks(self):
+        # 12345.67 × 0.35 = 4320.9845
+        assert calculate_commission(Decimal("12345.67"), MANAGER_LEAD_RATE) == Decimal("4320.98")
+        # 0.0125 rounds down, 0.025 rounds half-up
+        assert calculate_commission(Decimal("0.05"), Decimal("0.25")) == Decimal("0.01")
+        assert calculate_commission(Decimal("0.10"), Decimal("0.25")) == Decimal("0.03")
+
+    def test_calculate_commission_keeps_large_margins_exact(self):
+        assert calculate_commission(Decimal("9999999999.99"), Decimal("0.3500")) == Decimal("3500000000.00")
@@ -3,7 +3,6 @@ Health check endpoint tests.
 """
 
 import pytest
-from fastapi.testclient import TestClient
 
 
 def test_health_endpoint():
@@ -32,6 +31,9 @@ def test_masking():
     assert "123-45-67" not in masked
     assert "@johndoe" not in masked
 
+    # Test email in text is masked as a whole, not as a username
+    assert mask_sensitive("пишите на john.doe@example.com", "manager") == "пишите на jo***@ex***.com"
+
     # Test owner sees everything
     owner_masked = mask_sensitive(text, "owner")
     assert owner_masked == text
@@ -52,3 +54,49 @@ def test_password_hashing():
 
     # Wrong password should fail
     assert not verify_password("wrong_password", hashed)
+
+
+@pytest.mark.asyncio
+async def test_async_password_helpers_match_sync():
+    """Threaded helpers produce hashes the sync verifier accepts, at the configured cost."""
+    from src.config import settings
+    from src.utils.password import ahash_password, averify_password, verify_password
+
+    hashed = await ahash_password("test_password_123")
+
+    assert verify_password("test_password_123", hashed)
+    assert await averify_password("test_password_123", hashed)
+    assert not await averify_password("wrong_password", hashed)
+    assert hashed.split("$")[2] == f"{settings.bcrypt_rounds:02d}"
+
+
+def test_masking_prefilter_never_skips_a_match():
+    """The fast pre-filter (Hyperscan or marker check) must not hide real matches."""
+    from src.utils.masking import SENSITIVE_REGEX, _may_contain_sensitive
+
+    samples = [
+        "цена 48000 р/тн",
+        "звоните +7\xa0999 123 45 67",
+        "8 (912) 345-67-89",
+        "89121234567",
+        "почта ivan.petrov@mail.ru",
+        "пишите @ivanov_p",
+        "арматура А500С, склад МО",
+    ]
+    for text in samples:
+        if SENSITIVE_REGEX.search(text):
+            assert _may_contain_sensitive(text), text
+
+
+def test_masking_prefilter_handles_lone_surrogates():
+    """Text that cannot be UTF-8 encoded skips Hyperscan and is still masked."""
+    from types import SimpleNamespace
+    from unittest.mock import Mock, patch
+
+    from src.utils.masking import mask_sensitive
+
+    database = SimpleNamespace(scan=Mock())
+    with patch("src.utils.masking._hyperscan_database", return_value=database):
+        masked = mask_sensitive("пишите @johndoe \ud83d", "manager")
+    assert masked == "пишите @jo*** \ud83d"
+    database.scan.assert_not_called()
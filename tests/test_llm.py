@@ -0,0 +1,81 @@
+"""
+Tests for the LLM order-extraction response cache.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.services import llm
+
+
+def _fake_client(content='{"order_type": "sell", "product": "цемент М500", "price": 5200}'):
+    response = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))]
+    )
+    create = AsyncMock(return_value=response)
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))), create
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    llm._response_cache.clear()
+    yield
+    llm._response_cache.clear()
+
+
+class TestExtractOrderCache:
+    @pytest.mark.asyncio
+    async def test_repeated_text_calls_api_once(self):
+        client, create = _fake_client()
+        with patch.object(llm, "_get_client", return_value=client):
+            first = await llm.extract_order_llm("продам цемент М500 5200р")
+            second = await llm.extract_order_llm("продам цемент М500 5200р")
+
+        assert create.await_count == 1
+        assert second == first == {"order_type": "sell", "product": "цемент М500", "price": 5200}
+
+    @pytest.mark.asyncio
+    async def test_cached_result_is_a_copy(self):
+        client, _ = _fake_client()
+        with patch.object(llm, "_get_client", return_value=client):
+            first = await llm.extract_order_llm("продам цемент")
+            first["price"] = 1
+            second = await llm.extract_order_llm("продам цемент")
+
+        assert second["price"] == 5200
+
+    @pytest.mark.asyncio
+    async def test_different_text_is_not_cached(self):
+        client, create = _fake_client()
+        with patch.object(llm, "_get_client", return_value=client):
+            await llm.extract_order_llm("продам цемент")
+            await llm.extract_order_llm("куплю цемент")
+
+        assert create.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_is_refetched(self):
+        client, create = _fake_client()
+        with patch.object(llm, "_get_client", return_value=client), \
+                patch.object(llm, "_RESPONSE_CACHE_TTL", -1.0):
+            await llm.extract_order_llm("продам цемент")
+            await llm.extract_order_llm("продам цемент")
+
+        assert create.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_failures_are_not_cached(self):
+        client, create = _fake_client(content="not json")
+        with patch.object(llm, "_get_client", return_value=client):
+            assert await llm.extract_order_llm("продам цемент") is None
+            assert await llm.extract_order_llm("продам цемент") is None
+
+        assert create.await_count == 2
+
+    def test_cache_is_bounded(self):
+        with patch.object(llm, "_RESPONSE_CACHE_MAX", 2):
+            for key in ("a", "b", "c"):
+                llm._response_cache_put(key, {})
+        assert list(llm._response_cache) == ["b", "c"]
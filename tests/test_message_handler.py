@@ -0,0 +1,95 @@
+"""
+Tests for order matching in the message handler.
+
+Covers:
+- try_match_orders pairs a new order with a matching opposite order
+- Non-matching and same-side orders are ignored
+- Silent voice notes are skipped before download; other audio is transcribed
+"""
+
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from telethon.tl.types import DocumentAttributeAudio
+
+from src.models import DealStatus, Order, OrderType
+from src.services.message_handler import _resolve_event_text, try_match_orders
+
+
+def _order(order_type, message_id, product, price):
+    return Order(
+        order_type=order_type, chat_id=100, sender_id=message_id, message_id=message_id,
+        product=product, price=Decimal(price), raw_text=product, platform="telegram",
+    )
+
+
+class TestTryMatchOrders:
+    @pytest.mark.asyncio
+    async def test_matches_opposite_order(self, db_session):
+        db_session.add_all([
+            _order(OrderType.SELL, 1, "песок речной", 900),
+            _order(OrderType.SELL, 2, "арматура А500С 12мм", 45000),
+            _order(OrderType.BUY, 3, "арматура 12мм", 60000),
+        ])
+        new_order = _order(OrderType.BUY, 4, "арматура", 50000)
+        db_session.add(new_order)
+        await db_session.flush()
+
+        deal = await try_match_orders(db_session, new_order)
+
+        assert deal is not None
+        assert deal.status == DealStatus.COLD
+        assert deal.buy_order is new_order
+        assert deal.sell_order.message_id == 2
+        assert deal.margin == Decimal(5000)
+        assert new_order.is_active is False
+        assert deal.sell_order.is_active is False
+
+    @pytest.mark.asyncio
+    async def test_no_match(self, db_session):
+        db_session.add(_order(OrderType.SELL, 1, "песок речной", 900))
+        new_order = _order(OrderType.BUY, 2, "арматура", 50000)
+        db_session.add(new_order)
+        await db_session.flush()
+
+        assert await try_match_orders(db_session, new_order) is None
+        assert new_order.is_active is True
+
+
+def _audio_event(voice):
+    """Event carrying an audio document whose metadata reports duration=0."""
+    document = SimpleNamespace(
+        mime_type="audio/ogg" if voice else "audio/mpeg",
+        attributes=[DocumentAttributeAudio(duration=0, voice=voice)],
+    )
+    message = SimpleNamespace(voice=document if voice else None, document=document)
+    return SimpleNamespace(message=message, text=None)
+
+
+def _telegram(audio_bytes=b"audio"):
+    return SimpleNamespace(client=SimpleNamespace(download_media=AsyncMock(return_value=audio_bytes)))
+
+
+class TestResolveVoiceText:
+    @pytest.mark.asyncio
+    async def test_zero_duration_voice_note_skipped(self):
+        telegram = _telegram()
+        with patch("src.services.transcriber.transcribe_voice", new_callable=AsyncMock) as transcribe:
+            result = await _resolve_event_text(_audio_event(voice=True), telegram)
+
+        assert result == ("[голосовое сообщение]", None, None)
+        telegram.client.download_media.assert_not_awaited()
+        transcribe.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_audio_file_without_duration_still_transcribed(self):
+        telegram = _telegram()
+        with patch("src.services.transcriber.transcribe_voice",
+                   new_callable=AsyncMock, return_value="нужна арматура") as transcribe:
+            result = await _resolve_event_text(_audio_event(voice=False), telegram)
+
+        telegram.client.download_media.assert_awaited_once()
+        transcribe.assert_awaited_once()
+        assert result == ("[голосовое]: нужна арматура", None, None)
@@ -5,37 +5,24 @@ Verifies that all new columns are present in models after create_all,
 and that the migration script itself is structurally correct.
 """
 
-import os
-import sys
-
-# Set required env var before importing src modules
-os.environ.setdefault("TG_API_ID", "0")
-os.environ.setdefault("TG_API_HASH", "test")
-os.environ.setdefault("TG_SESSION_STRING", "test")
+import pathlib
+import re
+from types import SimpleNamespace
 
 import pytest
 import pytest_asyncio
 from sqlalchemy import inspect as sa_inspect
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-
-from src.models import Base
-
-TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
-
 
-@pytest_asyncio.fixture
-async def engine():
-    eng = create_async_engine(TEST_DATABASE_URL, echo=False)
-    async with eng.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    yield eng
-    await eng.dispose()
+_ADD_COLUMN_RE = re.compile(r'op\.add_column')
+_ADD_GUARD_RE = re.compile(r'if not _col_exists')
+_DROP_COLUMN_RE = re.compile(r'op\.drop_column')
+_DROP_GUARD_RE = re.compile(r'if _col_exists\(')
 
 
-@pytest_asyncio.fixture
-async def inspector(engine):
+@pytest_asyncio.fixture(scope="session")
+async def inspector(db_engine):
     """Return a dict of {table_name: [column_names]}."""
-    async with engine.connect() as conn:
+    async with db_engine.connect() as conn:
         def _inspect(sync_conn):
             insp = sa_inspect(sync_conn)
             tables = {}
@@ -149,90 +136,75 @@ class TestMonitoredChatsNewColumns:
 class TestMigrationScript:
     """Validate migration script structure and metadata (source-level checks)."""
 
-    @pytest.fixture
-    def source(self):
-        import pathlib
+    EXPECTED_TABLES = ["orders", "detected_deals", "users", "ledger", "monitored_chats"]
+    EXPECTED_COLUMNS = [
+        "platform", "niche", "unit", "volume_numeric",
+        "lead_source", "deal_model", "manager_commission_rate",
+        "buyer_payment_status", "seller_payment_status",
+        "our_commission_status", "payment_method",
+        "ai_draft_message", "market_price_context",
+        "niches", "level", "telegram_user_id",
+        "commission_rate_applied",
+    ]
+
+    @pytest.fixture(scope="class")
+    def migration(self):
+        """Read the script once and split it into upgrade/downgrade bodies."""
         fpath = pathlib.Path(__file__).resolve().parent.parent / "alembic" / "versions" / "011_strategic_update.py"
-        return fpath.read_text(encoding="utf-8")
+        source = fpath.read_text(encoding="utf-8")
+        up_start = source.index("def upgrade()")
+        down_start = source.index("def downgrade()")
+        return SimpleNamespace(
+            source=source,
+            upgrade_body=source[up_start:down_start],
+            downgrade_body=source[down_start:],
+        )
 
-    def test_revision_id(self, source):
-        assert 'revision: str = "011_strategic_update"' in source
+    def test_revision_id(self, migration):
+        assert 'revision: str = "011_strategic_update"' in migration.source
 
-    def test_down_revision(self, source):
-        assert 'down_revision' in source
-        assert '"010_telegram_message_id"' in source
+    def test_down_revision(self, migration):
+        assert 'down_revision' in migration.source
+        assert '"010_telegram_message_id"' in migration.source
 
-    def test_has_upgrade_function(self, source):
-        assert "def upgrade()" in source
+    def test_has_upgrade_function(self, migration):
+        assert "def upgrade()" in migration.source
 
-    def test_has_downgrade_function(self, source):
-        assert "def downgrade()" in source
+    def test_has_downgrade_function(self, migration):
+        assert "def downgrade()" in migration.source
 
-    def test_upgrade_covers_all_tables(self, source):
+    def test_upgrade_covers_all_tables(self, migration):
         """Upgrade section mentions all 5 tables."""
-        # Extract text between "def upgrade" and "def downgrade"
-        up_start = source.index("def upgrade()")
-        down_start = source.index("def downgrade()")
-        upgrade_body = source[up_start:down_start]
-        for table in ["orders", "detected_deals", "users", "ledger", "monitored_chats"]:
-            assert table in upgrade_body, f"Table '{table}' not found in upgrade()"
+        for table in self.EXPECTED_TABLES:
+            assert table in migration.upgrade_body, f"Table '{table}' not found in upgrade()"
 
-    def test_downgrade_covers_all_tables(self, source):
+    def test_downgrade_covers_all_tables(self, migration):
         """Downgrade section mentions all 5 tables."""
-        down_start = source.index("def downgrade()")
-        downgrade_body = source[down_start:]
-        for table in ["orders", "detected_deals", "users", "ledger", "monitored_chats"]:
-            assert table in downgrade_body, f"Table '{table}' not found in downgrade()"
+        for table in self.EXPECTED_TABLES:
+            assert table in migration.downgrade_body, f"Table '{table}' not found in downgrade()"
 
-    def test_all_columns_in_upgrade(self, source):
+    def test_all_columns_in_upgrade(self, migration):
         """Every new column name appears in upgrade()."""
-        up_start = source.index("def upgrade()")
-        down_start = source.index("def downgrade()")
-        upgrade_body = source[up_start:down_start]
-        expected_columns = [
-            "platform", "niche", "unit", "volume_numeric",
-            "lead_source", "deal_model", "manager_commission_rate",
-            "buyer_payment_status", "seller_payment_status",
-            "our_commission_status", "payment_method",
-            "ai_draft_message", "market_price_context",
-            "niches", "level", "telegram_user_id",
-            "commission_rate_applied",
-        ]
-        for col in expected_columns:
-            assert col in upgrade_body, f"Column '{col}' not found in upgrade()"
-
-    def test_all_columns_in_downgrade(self, source):
+        for col in self.EXPECTED_COLUMNS:
+            assert col in migration.upgrade_body, f"Column '{col}' not found in upgrade()"
+
+    def test_all_columns_in_downgrade(self, migration):
         """Every new column name appears in downgrade()."""
-        down_start = source.index("def downgrade()")
-        downgrade_body = source[down_start:]
-        expected_columns = [
-            "platform", "niche", "unit", "volume_numeric",
-            "lead_source", "deal_model", "manager_commission_rate",
-            "buyer_payment_status", "seller_payment_status",
-            "our_commission_status", "payment_method",
-            "ai_draft_message", "market_price_context",
-            "niches", "level", "telegram_user_id",
-            "commission_rate_applied",
-        ]
-        for col in expected_columns:
-            assert col in downgrade_body, f"Column '{col}' not found in downgrade()"
-
-    def test_idempotency_guards(self, source):
+        for col in self.EXPECTED_COLUMNS:
+            assert col in migration.downgrade_body, f"Column '{col}' not found in downgrade()"
+
+    def test_idempotency_guards(self, migration):
         """Every add_column is guarded by _col_exists check."""
-        import re
-        add_count = len(re.findall(r'op\.add_column', source))
-        guard_count = len(re.findall(r'if not _col_exists', source))
+        add_count = len(_ADD_COLUMN_RE.findall(migration.source))
+        guard_count = len(_ADD_GUARD_RE.findall(migration.source))
         assert guard_count == add_count, (
             f"Mismatch: {add_count} add_column vs {guard_count} _col_exists guards"
         )
 
-    def test_downgrade_idempotency_guards(self, source):
+    def test_downgrade_idempotency_guards(self, migration):
         """Every drop_column is guarded by _col_exists check."""
-        import re
-        down_start = source.index("def downgrade()")
-        downgrade_body = source[down_start:]
-        drop_count = len(re.findall(r'op\.drop_column', downgrade_body))
-        guard_count = len(re.findall(r'if _col_exists\(', downgrade_body))
+        drop_count = len(_DROP_COLUMN_RE.findall(migration.downgrade_body))
+        guard_count = len(_DROP_GUARD_RE.findall(migration.downgrade_body))
         assert guard_count == drop_count, (
             f"Mismatch: {drop_count} drop_column vs {guard_count} _col_exists guards in downgrade"
         )
@@ -8,16 +8,13 @@ Covers:
 - Notification type mapping
 """
 
-import os
+import json
 from datetime import datetime, timezone
 from types import SimpleNamespace
 
-os.environ.setdefault("TG_API_ID", "0")
-os.environ.setdefault("TG_API_HASH", "test")
-os.environ.setdefault("TG_SESSION_STRING", "test")
-
+import pytest
 from pydantic import BaseModel
-from typing import Optional
+from typing import NamedTuple, Optional
 
 
 # Replicate the notification schemas for testing (avoid importing API chain)
@@ -39,18 +36,49 @@ class NotificationStatusResponse(BaseModel):
     my_cold_deals_count: int = 0
 
 
+# Read timestamps are only compared with themselves; any fixed instant will do
+_FIXED_NOW = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+_FIXED_ISO = _FIXED_NOW.isoformat()
+
+
+# Lightweight stand-ins for NegotiationMessage / DetectedDeal rows
+class _Msg(NamedTuple):
+    role: str
+    read_at: Optional[datetime] = None
+    id: int = 0
+    content: str = ""
+
+
+class _Deal(NamedTuple):
+    status: str
+    manager_id: Optional[int] = None
+
+
+# Shared instances for read-only assertions; validated once at import
+_BASIC_INFO = DealUnreadInfo(
+    deal_id=1,
+    negotiation_id=10,
+    product="арматура А500С",
+    unread_seller=2,
+    unread_buyer=1,
+)
+_SELLER_INFO = DealUnreadInfo(
+    deal_id=42,
+    negotiation_id=7,
+    product="арматура А500С",
+    unread_seller=2,
+    unread_buyer=0,
+    last_sender_role="seller",
+    last_message_preview="Добрый день, есть в наличии",
+)
+
+
 # ── DealUnreadInfo schema ───────────────────────────────
 
 
 class TestDealUnreadInfo:
     def test_basic_fields(self):
-        info = DealUnreadInfo(
-            deal_id=1,
-            negotiation_id=10,
-            product="арматура А500С",
-            unread_seller=2,
-            unread_buyer=1,
-        )
+        info = _BASIC_INFO
         assert info.deal_id == 1
         assert info.negotiation_id == 10
         assert info.product == "арматура А500С"
@@ -58,39 +86,19 @@ class TestDealUnreadInfo:
         assert info.unread_buyer == 1
 
     def test_last_sender_role_seller(self):
-        info = DealUnreadInfo(
-            deal_id=1,
-            negotiation_id=10,
-            product="цемент М500",
-            unread_seller=1,
-            unread_buyer=0,
-            last_sender_role="seller",
-            last_message_preview="Есть 20 тонн со склада",
-        )
+        info = _SELLER_INFO
         assert info.last_sender_role == "seller"
-        assert info.last_message_preview == "Есть 20 тонн со склада"
+        assert info.last_message_preview == "Добрый день, есть в наличии"
 
     def test_last_sender_role_buyer(self):
-        info = DealUnreadInfo(
-            deal_id=2,
-            negotiation_id=20,
-            product="профлист",
-            unread_seller=0,
-            unread_buyer=3,
-            last_sender_role="buyer",
-            last_message_preview="Какая цена за лист?",
+        info = _SELLER_INFO.model_copy(
+            update={"last_sender_role": "buyer", "last_message_preview": "Какая цена за лист?"}
         )
         assert info.last_sender_role == "buyer"
         assert info.last_message_preview == "Какая цена за лист?"
 
     def test_optional_fields_default_none(self):
-        info = DealUnreadInfo(
-            deal_id=1,
-            negotiation_id=10,
-            product="test",
-            unread_seller=0,
-            unread_buyer=0,
-        )
+        info = _BASIC_INFO
         assert info.last_message_at is None
         assert info.last_sender_role is None
         assert info.last_message_preview is None
@@ -109,16 +117,15 @@ class TestDealUnreadInfo:
         assert len(info.last_message_preview) == 80
 
     def test_last_message_at_iso_format(self):
-        now = datetime.now(timezone.utc)
         info = DealUnreadInfo(
             deal_id=1,
             negotiation_id=10,
             product="test",
             unread_seller=1,
             unread_buyer=0,
-            last_message_at=now.isoformat(),
+            last_message_at=_FIXED_ISO,
         )
-        assert info.last_message_at == now.isoformat()
+        assert info.last_message_at == _FIXED_ISO
 
 
 # ── NotificationStatusResponse schema ───────────────────
@@ -145,18 +152,9 @@ class TestNotificationStatusResponse:
         assert resp.my_cold_deals_count == 0
 
     def test_response_with_deal_unread(self):
-        deal_info = DealUnreadInfo(
-            deal_id=42,
-            negotiation_id=7,
-            product="арматура А500С",
-            unread_seller=2,
-            unread_buyer=0,
-            last_sender_role="seller",
-            last_message_preview="Добрый день, есть в наличии",
-        )
         resp = NotificationStatusResponse(
             total_unread_messages=2,
-            deals_with_unread=[deal_info],
+            deals_with_unread=[_SELLER_INFO],
             new_leads_count=1,
             my_cold_deals_count=0,
         )
@@ -166,13 +164,8 @@ class TestNotificationStatusResponse:
 
     def test_multiple_deals_with_unread(self):
         deals = [
-            DealUnreadInfo(
-                deal_id=i,
-                negotiation_id=i * 10,
-                product=f"product_{i}",
-                unread_seller=1,
-                unread_buyer=1,
-                last_sender_role="seller",
+            _SELLER_INFO.model_copy(
+                update={"deal_id": i, "negotiation_id": i * 10, "product": f"product_{i}"}
             )
             for i in range(5)
         ]
@@ -189,24 +182,14 @@ class TestNotificationStatusResponse:
         """Response should serialize to JSON correctly."""
         resp = NotificationStatusResponse(
             total_unread_messages=1,
-            deals_with_unread=[
-                DealUnreadInfo(
-                    deal_id=1,
-                    negotiation_id=10,
-                    product="цемент",
-                    unread_seller=1,
-                    unread_buyer=0,
-                    last_sender_role="seller",
-                    last_message_preview="Добрый день",
-                )
-            ],
+            deals_with_unread=[_SELLER_INFO],
             new_leads_count=2,
             my_cold_deals_count=1,
         )
-        data = resp.model_dump()
+        data = json.loads(resp.model_dump_json())
         assert data["my_cold_deals_count"] == 1
         assert data["deals_with_unread"][0]["last_sender_role"] == "seller"
-        assert data["deals_with_unread"][0]["last_message_preview"] == "Добрый день"
+        assert data["deals_with_unread"][0]["last_message_preview"] == "Добрый день, есть в наличии"
 
 
 # ── Read/unread message state ───────────────────────────
@@ -215,98 +198,87 @@ class TestNotificationStatusResponse:
 class TestMessageReadState:
     def test_message_initially_unread(self):
         """A new message has read_at=None (unread)."""
-        msg = SimpleNamespace(
-            id=1,
-            role="seller",
-            content="Привет",
-            read_at=None,
-        )
+        msg = _Msg(id=1, role="seller", content="Привет", read_at=None)
         assert msg.read_at is None
 
     def test_message_marked_read(self):
         """After marking read, read_at is set to a datetime."""
-        now = datetime.now(timezone.utc)
-        msg = SimpleNamespace(
-            id=1,
-            role="seller",
-            content="Привет",
-            read_at=now,
-        )
+        now = _FIXED_NOW
+        msg = _Msg(id=1, role="seller", content="Привет", read_at=now)
         assert msg.read_at is not None
         assert msg.read_at == now
 
     def test_manager_messages_not_counted_as_unread(self):
         """Manager's own messages should never be counted as unread."""
         messages = [
-            SimpleNamespace(role="manager", read_at=None),
-            SimpleNamespace(role="seller", read_at=None),
-            SimpleNamespace(role="buyer", read_at=None),
-            SimpleNamespace(role="manager", read_at=None),
+            _Msg(role="manager", read_at=None),
+            _Msg(role="seller", read_at=None),
+            _Msg(role="buyer", read_at=None),
+            _Msg(role="manager", read_at=None),
         ]
-        unread = [m for m in messages if m.role != "manager" and m.read_at is None]
-        assert len(unread) == 2
+        unread = sum(1 for m in messages if m.role != "manager" and m.read_at is None)
+        assert unread == 2
 
     def test_mixed_read_unread(self):
         """Some messages read, some not."""
-        now = datetime.now(timezone.utc)
+        now = _FIXED_NOW
         messages = [
-            SimpleNamespace(role="seller", read_at=now),   # read
-            SimpleNamespace(role="seller", read_at=None),  # unread
-            SimpleNamespace(role="buyer", read_at=now),    # read
-            SimpleNamespace(role="buyer", read_at=None),   # unread
-            SimpleNamespace(role="manager", read_at=None), # manager - skip
+            _Msg(role="seller", read_at=now),   # read
+            _Msg(role="seller", read_at=None),  # unread
+            _Msg(role="buyer", read_at=now),    # read
+            _Msg(role="buyer", read_at=None),   # unread
+            _Msg(role="manager", read_at=None), # manager - skip
         ]
-        unread_seller = [m for m in messages if m.role == "seller" and m.read_at is None]
-        unread_buyer = [m for m in messages if m.role == "buyer" and m.read_at is None]
-        assert len(unread_seller) == 1
-        assert len(unread_buyer) == 1
+        unread_seller = sum(1 for m in messages if m.role == "seller" and m.read_at is None)
+        unread_buyer = sum(1 for m in messages if m.role == "buyer" and m.read_at is None)
+        assert unread_seller == 1
+        assert unread_buyer == 1
 
     def test_all_read_zero_unread(self):
         """When all messages are read, unread count is 0."""
-        now = datetime.now(timezone.utc)
+        now = _FIXED_NOW
         messages = [
-            SimpleNamespace(role="seller", read_at=now),
-            SimpleNamespace(role="buyer", read_at=now),
+            _Msg(role="seller", read_at=now),
+            _Msg(role="buyer", read_at=now),
         ]
-        unread = [m for m in messages if m.role != "manager" and m.read_at is None]
-        assert len(unread) == 0
+        unread = sum(1 for m in messages if m.role != "manager" and m.read_at is None)
+        assert unread == 0
 
 
 # ── Cold deal detection logic ───────────────────────────
 
 
-class TestColdDealCounting:
-    def test_cold_assigned_deal_counted(self):
-        """Cold deal assigned to manager should be counted."""
-        deals = [
-            SimpleNamespace(status="cold", manager_id=1),
-            SimpleNamespace(status="cold", manager_id=1),
-            SimpleNamespace(status="warm", manager_id=1),
-            SimpleNamespace(status="cold", manager_id=2),   # other manager
-            SimpleNamespace(status="cold", manager_id=None), # pool
-        ]
-        my_cold = [d for d in deals if d.status == "cold" and d.manager_id == 1]
-        assert len(my_cold) == 2
+_MIXED_DEALS = (
+    _Deal(status="cold", manager_id=1),
+    _Deal(status="cold", manager_id=1),
+    _Deal(status="warm", manager_id=1),
+    _Deal(status="cold", manager_id=2),     # other manager
+    _Deal(status="cold", manager_id=None),  # pool
+)
+_NO_COLD_DEALS = (
+    _Deal(status="warm", manager_id=1),
+    _Deal(status="won", manager_id=1),
+)
+_POOL_DEALS = (
+    _Deal(status="cold", manager_id=None),
+    _Deal(status="warm", manager_id=None),
+)
 
-    def test_no_cold_deals(self):
-        """Manager has no cold deals."""
-        deals = [
-            SimpleNamespace(status="warm", manager_id=1),
-            SimpleNamespace(status="won", manager_id=1),
-        ]
-        my_cold = [d for d in deals if d.status == "cold" and d.manager_id == 1]
-        assert len(my_cold) == 0
 
-    def test_pool_leads_not_counted_as_my_cold(self):
-        """Unassigned pool leads should not appear in my_cold_deals."""
-        deals = [
-            SimpleNamespace(status="cold", manager_id=None),
-            SimpleNamespace(status="warm", manager_id=None),
-        ]
-        my_cold = [d for d in deals if d.status == "cold" and d.manager_id == 1]
-        pool_leads = [d for d in deals if d.manager_id is None and d.status in ("cold", "warm")]
-        assert len(my_cold) == 0
-        assert len(pool_leads) == 2
+class TestColdDealCounting:
+    @pytest.mark.parametrize("deals, expected", [
+        pytest.param(_MIXED_DEALS, 2, id="cold_assigned_deal_counted"),
+        pytest.param(_NO_COLD_DEALS, 0, id="no_cold_deals"),
+        # Unassigned pool leads should not appear in my_cold_deals
+        pytest.param(_POOL_DEALS, 0, id="pool_leads_not_counted_as_my_cold"),
+    ])
+    def test_my_cold_count(self, deals, expected):
+        my_cold = sum(1 for d in deals if d.status == "cold" and d.manager_id == 1)
+        assert my_cold == expected
+
+    def test_pool_leads_counted_as_pool(self):
+        pool_leads = sum(1 for d in _POOL_DEALS if d.manager_id is None and d.status in ("cold", "warm"))
+        assert pool_leads == 2
 
     def test_cold_grows_triggers_notification(self):
         """Simulating the frontend cold deal growth detection."""
@@ -327,31 +299,33 @@ class TestColdDealCounting:
 
 # ── Notification type mapping ─────────────────────────
 
+# Event -> handler tables mirrored from the panel's base.html
+_SOUND_FUNCTIONS = {
+    'message': 'playMessageSound',
+    'lead': 'playLeadSound',
+    'announcement': 'playAnnouncementSound',
+    'browser_alert': 'playBrowserAlertSound',
+}
+_TOAST_TYPES = {
+    'new_message': 'message',
+    'new_lead': 'lead',
+    'cold_deal': 'lead',
+    'announcement': 'announcement',
+}
+
 
 class TestNotificationTypes:
     """Verify that different events map to different notification types."""
 
     def test_all_sound_types_distinct(self):
         """All notification event sounds are distinct."""
-        sound_functions = {
-            'message': 'playMessageSound',
-            'lead': 'playLeadSound',
-            'announcement': 'playAnnouncementSound',
-            'browser_alert': 'playBrowserAlertSound',
-        }
-        assert len(set(sound_functions.values())) == 4
+        assert len(frozenset(_SOUND_FUNCTIONS.values())) == len(_SOUND_FUNCTIONS)
 
     def test_toast_types_distinct(self):
         """Each notification event uses a different toast type."""
-        toast_types = {
-            'new_message': 'message',
-            'new_lead': 'lead',
-            'cold_deal': 'lead',
-            'announcement': 'announcement',
-        }
         # Message and announcement are distinct types
-        assert toast_types['new_message'] != toast_types['announcement']
-        assert toast_types['new_lead'] != toast_types['new_message']
+        assert _TOAST_TYPES['new_message'] != _TOAST_TYPES['announcement']
+        assert _TOAST_TYPES['new_lead'] != _TOAST_TYPES['new_message']
 
     def test_message_notification_shows_sender(self):
         """Message toast should display sender role (buyer/seller)."""
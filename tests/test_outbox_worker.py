@@ -0,0 +1,348 @@
+"""
+Tests for the outbox worker.
+
+Covers:
+- calculate_typing_delay determinism and bounds
+- outbox_worker_iteration status write-back
+- FloodWait releases the recipient's messages for retry
+- recover_stuck_messages, on startup and periodically in run_outbox_worker
+"""
+
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from telethon.errors import FloodWaitError
+
+from src.services.outbox_worker import (
+    STUCK_SENDING_TIMEOUT,
+    _chat_limiter,
+    _chat_limiters,
+    calculate_typing_delay,
+    outbox_worker_iteration,
+    recover_stuck_messages,
+    run_outbox_worker,
+)
+
+
+class _FakeTelegram:
+    """
+    Telegram stand-in returning sequential message IDs.
+
+    Fails for recipient 0 and raises FloodWait for recipient -1.
+    """
+
+    def __init__(self):
+        self.sent = []
+        self.typing_delays = []
+
+    async def send_message(self, recipient_id, text, typing_delay=0, reply_to=None):
+        if recipient_id == 0:
+            return None
+        if recipient_id == -1:
+            raise FloodWaitError(request=None, capture=30)
+        self.sent.append((recipient_id, text))
+        self.typing_delays.append(typing_delay)
+        return 1000 + len(self.sent)
+
+
+@pytest_asyncio.fixture
+async def worker_sessions(db_connection):
+    """Route the worker's own get_db_context() sessions to the test transaction."""
+    # Recipient groups use their sessions concurrently, so they must not
+    # interleave SAVEPOINTs on the shared connection: their commits are
+    # left to the outer test transaction instead.
+    factory = async_sessionmaker(
+        bind=db_connection,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        join_transaction_mode="rollback_only",
+    )
+
+    @asynccontextmanager
+    async def _context():
+        async with factory() as session:
+            yield session
+
+    with patch("src.services.outbox_worker.get_db_context", _context), \
+            patch.dict("src.services.outbox_worker._chat_limiters", clear=True):
+        yield
+
+
+# ── calculate_typing_delay ────────────────────────────────
+
+
+class TestCalculateTypingDelay:
+    def test_same_seed_same_delay(self):
+        text = "Добрый день, арматура ещё в наличии?"
+        assert calculate_typing_delay(text, seed=42) == calculate_typing_delay(text, seed=42)
+
+    def test_different_seeds_differ(self):
+        text = "Добрый день, арматура ещё в наличии?"
+        assert calculate_typing_delay(text, seed=1) != calculate_typing_delay(text, seed=2)
+
+    def test_without_seed_is_deterministic(self):
+        assert calculate_typing_delay("привет") == calculate_typing_delay("привет")
+
+    def test_short_text_lower_bound(self):
+        assert calculate_typing_delay("", seed=7) >= 1.0
+
+    def test_long_text_capped(self):
+        assert calculate_typing_delay("x" * 1000, seed=7) == 4.0
+
+
+# ── _chat_limiter ─────────────────────────────────────────
+
+
+class TestChatLimiter:
+    def test_evicts_least_recently_used(self):
+        with patch.dict("src.services.outbox_worker._chat_limiters", clear=True), \
+                patch("src.services.outbox_worker._CHAT_LIMITERS_MAX", 2):
+            active = _chat_limiter(1)
+            _chat_limiter(2)
+            _chat_limiter(1)  # chat 1 is in use again
+            _chat_limiter(3)
+            assert _chat_limiter(1) is active
+            assert list(_chat_limiters) == [3, 1]
+
+
+# ── outbox_worker_iteration ───────────────────────────────
+
+
+@pytest.mark.usefixtures("worker_sessions")
+class TestOutboxWorkerIteration:
+    @pytest.mark.asyncio
+    async def test_statuses_written_back(self, db_session):
+        from sqlalchemy import select
+
+        from src.models import OutboxMessage, OutboxStatus
+
+        db_session.add_all([
+            OutboxMessage(recipient_id=111, message_text="первое"),
+            OutboxMessage(recipient_id=222, message_text="второе"),
+            OutboxMessage(recipient_id=0, message_text="в никуда"),
+        ])
+        await db_session.commit()
+
+        telegram = _FakeTelegram()
+        with patch("src.services.outbox_worker.get_telegram_service", return_value=telegram), \
+                patch("src.services.outbox_worker.asyncio.sleep", new_callable=AsyncMock):
+            processed = await outbox_worker_iteration(db_session)
+
+        assert processed == 3
+        assert len(telegram.sent) == 2
+
+        db_session.expire_all()
+        rows = (await db_session.execute(
+            select(OutboxMessage).order_by(OutboxMessage.id)
+        )).scalars().all()
+        assert [r.status for r in rows] == [
+            OutboxStatus.SENT, OutboxStatus.SENT, OutboxStatus.FAILED,
+        ]
+        assert rows[0].sent_at is not None
+        assert rows[2].sent_at is None
+        assert rows[2].error_message == "Failed to send via Telegram"
+
+    @pytest.mark.asyncio
+    async def test_empty_queue(self, db_session):
+        assert await outbox_worker_iteration(db_session) == 0
+
+    @pytest.mark.asyncio
+    async def test_same_recipient_sent_in_order(self, db_session):
+        from src.models import OutboxMessage
+
+        db_session.add_all([
+            OutboxMessage(recipient_id=111, message_text="раз"),
+            OutboxMessage(recipient_id=222, message_text="другому"),
+            OutboxMessage(recipient_id=111, message_text="два"),
+        ])
+        await db_session.commit()
+
+        telegram = _FakeTelegram()
+        with patch("src.services.outbox_worker.get_telegram_service", return_value=telegram), \
+                patch("src.services.outbox_worker.asyncio.sleep", new_callable=AsyncMock) as sleep:
+            processed = await outbox_worker_iteration(db_session)
+
+        assert processed == 3
+        assert [text for rid, text in telegram.sent if rid == 111] == ["раз", "два"]
+        # Only the first message of the burst to 111 simulates typing
+        delays = dict(zip((text for _, text in telegram.sent), telegram.typing_delays, strict=True))
+        assert delays["раз"] > 0 and delays["другому"] > 0
+        assert delays["два"] == 0
+        # Only the second message to the same chat waits for the per-chat limiter
+        assert sleep.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_links_telegram_id_to_negotiation_message(self, db_session):
+        from sqlalchemy import select
+
+        from src.models import (
+            MessageRole,
+            Negotiation,
+            NegotiationMessage,
+            OutboxMessage,
+        )
+
+        negotiation = Negotiation(deal_id=1, seller_chat_id=111, seller_sender_id=111)
+        db_session.add(negotiation)
+        await db_session.flush()
+        # Same text twice: only the linked entry may receive the Telegram ID
+        older = NegotiationMessage(
+            negotiation_id=negotiation.id, role=MessageRole.AI, content="ок",
+        )
+        linked = NegotiationMessage(
+            negotiation_id=negotiation.id, role=MessageRole.AI, content="ок",
+        )
+        db_session.add_all([older, linked])
+        db_session.add(OutboxMessage(
+            recipient_id=111, message_text="ок",
+            negotiation_id=negotiation.id, negotiation_message=linked,
+        ))
+        await db_session.commit()
+
+        telegram = _FakeTelegram()
+        with patch("src.services.outbox_worker.get_telegram_service", return_value=telegram), \
+                patch("src.services.outbox_worker.asyncio.sleep", new_callable=AsyncMock):
+            await outbox_worker_iteration(db_session)
+
+        db_session.expire_all()
+        rows = (await db_session.execute(
+            select(NegotiationMessage).order_by(NegotiationMessage.id)
+        )).scalars().all()
+        assert [r.telegram_message_id for r in rows] == [None, 1001]
+
+    @pytest.mark.asyncio
+    async def test_only_pending_rows_are_claimed(self, db_session):
+        from src.models import OutboxMessage, OutboxStatus
+
+        db_session.add_all([
+            OutboxMessage(recipient_id=111, message_text="в работе", status=OutboxStatus.SENDING),
+            OutboxMessage(recipient_id=222, message_text="уже ушло", status=OutboxStatus.SENT),
+            OutboxMessage(recipient_id=333, message_text="новое"),
+        ])
+        await db_session.commit()
+
+        telegram = _FakeTelegram()
+        with patch("src.services.outbox_worker.get_telegram_service", return_value=telegram), \
+                patch("src.services.outbox_worker.asyncio.sleep", new_callable=AsyncMock):
+            processed = await outbox_worker_iteration(db_session)
+
+        assert processed == 1
+        assert telegram.sent == [(333, "новое")]
+
+    @pytest.mark.asyncio
+    async def test_claim_released_without_telegram(self, db_session):
+        from sqlalchemy import select
+
+        from src.models import OutboxMessage, OutboxStatus
+
+        db_session.add(OutboxMessage(recipient_id=111, message_text="подождёт"))
+        await db_session.commit()
+
+        with patch("src.services.outbox_worker.get_telegram_service", return_value=None), \
+                patch("src.services.outbox_worker.asyncio.sleep", new_callable=AsyncMock):
+            await outbox_worker_iteration(db_session)
+
+        db_session.expire_all()
+        row = (await db_session.execute(select(OutboxMessage))).scalar_one()
+        assert row.status == OutboxStatus.PENDING
+
+
+    @pytest.mark.asyncio
+    async def test_flood_wait_releases_recipient_burst(self, db_session):
+        from sqlalchemy import select
+
+        from src.models import OutboxMessage, OutboxStatus
+
+        db_session.add_all([
+            OutboxMessage(recipient_id=-1, message_text="упёрлись в лимит"),
+            OutboxMessage(recipient_id=222, message_text="другому"),
+            OutboxMessage(recipient_id=-1, message_text="следом"),
+        ])
+        await db_session.commit()
+
+        telegram = _FakeTelegram()
+        with patch("src.services.outbox_worker.get_telegram_service", return_value=telegram), \
+                patch("src.services.outbox_worker.asyncio.sleep", new_callable=AsyncMock):
+            await outbox_worker_iteration(db_session)
+
+        assert telegram.sent == [(222, "другому")]
+        db_session.expire_all()
+        rows = (await db_session.execute(
+            select(OutboxMessage).order_by(OutboxMessage.id)
+        )).scalars().all()
+        assert [r.status for r in rows] == [
+            OutboxStatus.PENDING, OutboxStatus.SENT, OutboxStatus.PENDING,
+        ]
+        assert rows[0].claimed_at is None and rows[2].claimed_at is None
+        assert rows[0].error_message is None
+
+
+# ── recover_stuck_messages ────────────────────────────────
+
+
+class TestRecoverStuckMessages:
+    @pytest.mark.asyncio
+    async def test_resets_only_stale_claims(self, db_session):
+        from sqlalchemy import select
+
+        from src.models import OutboxMessage, OutboxStatus
+
+        now = datetime.now(timezone.utc)
+        db_session.add_all([
+            OutboxMessage(
+                recipient_id=111, message_text="зависло",
+                status=OutboxStatus.SENDING, claimed_at=now - timedelta(minutes=30),
+            ),
+            OutboxMessage(
+                recipient_id=222, message_text="в процессе",
+                status=OutboxStatus.SENDING, claimed_at=now,
+            ),
+            OutboxMessage(recipient_id=333, message_text="отправлено", status=OutboxStatus.SENT),
+        ])
+        await db_session.commit()
+
+        recovered = await recover_stuck_messages(db_session)
+
+        assert recovered == 1
+        db_session.expire_all()
+        rows = (await db_session.execute(
+            select(OutboxMessage).order_by(OutboxMessage.id)
+        )).scalars().all()
+        assert [r.status for r in rows] == [
+            OutboxStatus.PENDING, OutboxStatus.SENDING, OutboxStatus.SENT,
+        ]
+        assert rows[0].claimed_at is None
+
+
+class _StopWorkerError(Exception):
+    """Raised from the patched sleep to end run_outbox_worker's loop."""
+
+
+class TestRunOutboxWorker:
+    @pytest.mark.asyncio
+    async def test_recovers_periodically(self):
+        # Each loop iteration advances the clock by a fifth of the timeout
+        clock = iter(i * STUCK_SENDING_TIMEOUT.total_seconds() / 5 for i in range(1000))
+        sleep = AsyncMock(side_effect=[None] * 10 + [_StopWorkerError()])
+
+        @asynccontextmanager
+        async def _context():
+            yield None
+
+        with patch("src.services.outbox_worker.get_db_context", _context), \
+                patch("src.services.outbox_worker.recover_stuck_messages",
+                      new_callable=AsyncMock, return_value=0) as recover, \
+                patch("src.services.outbox_worker.outbox_worker_iteration",
+                      new_callable=AsyncMock, return_value=0) as iteration, \
+                patch("src.services.outbox_worker.time.monotonic", side_effect=lambda: next(clock)), \
+                patch("src.services.outbox_worker.asyncio.sleep", sleep):
+            with pytest.raises(_StopWorkerError):
+                await run_outbox_worker(interval_seconds=0)
+
+        assert iteration.await_count == 11
+        # Startup plus every later timeout period, not just once
+        assert 2 <= recover.await_count < iteration.await_count
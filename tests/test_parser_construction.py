@@ -10,14 +10,10 @@ Tests all 9 user-provided messages to verify:
 - Region extraction
 """
 
-import os
 import sys
 from decimal import Decimal
 
-# Set required env var before importing src modules
-os.environ.setdefault("TG_API_ID", "0")
-os.environ.setdefault("TG_API_HASH", "test")
-os.environ.setdefault("TG_SESSION_STRING", "test")
+import pytest
 
 from src.services.message_handler import (
     detect_order_type,
@@ -33,248 +29,70 @@ from src.models.order import OrderType
 
 
 # =====================================================
-# SELL messages
+# The 9 user-provided messages
 # =====================================================
 
-class TestSellMessage1:
-    """Продаю арматуру А500С д12, 47000р/тн, от 20 тонн, склад Тула"""
-
-    text = "Продаю арматуру А500С д12, 47000р/тн, от 20 тонн, склад Тула"
-
-    def test_order_type(self):
-        assert detect_order_type(self.text) == OrderType.SELL
-
-    def test_product(self):
-        product, niche = extract_product(self.text)
+# (id, text, order_type, product stems (any), price, (volume, unit), region).
+# None means the message has no expectation for that field.
+_MESSAGES = [
+    ("sell1", "Продаю арматуру А500С д12, 47000р/тн, от 20 тонн, склад Тула",
+     OrderType.SELL, ("арматур",), Decimal("47000"), (20.0, "тонна"), "Тула"),
+    ("sell2", "Профнастил С21 0.5мм оцинк, 580р/м², наличие 3000м², МСК",
+     OrderType.SELL, ("профнастил",), Decimal("580"), (3000.0, "м²"), "Москва"),
+    ("sell3", "Цемент М500 навал, 4200/тн, отгрузка с завода Воскресенск",
+     OrderType.SELL, ("цемент",), Decimal("4200"), None, "Воскресенск"),
+    ("sell4", "Остатки бруса 150х150, 12000 руб/м³, ~15 кубов, самовывоз Подольск",
+     OrderType.SELL, ("брус",), Decimal("12000"), (15.0, "м³"), "Подольск"),
+    ("sell5", "Реализуем щебень фр.5-20, 1850/тн, от 1 вагона",
+     OrderType.SELL, ("щебень", "щебен"), Decimal("1850"), (1.0, "вагон"), None),
+    ("buy1", "Нужна арматура 10мм А500С, 40 тонн, Москва, безнал",
+     OrderType.BUY, ("арматур",), None, (40.0, "тонна"), "Москва"),
+    ("buy2", "Ищу профлист С8 окрашенный, ~500м², доставка Казань",
+     OrderType.BUY, ("профлист",), None, (500.0, "м²"), "Казань"),
+    ("buy3", "Закупаем цемент М400, объём 200 тонн/мес, нужен поставщик МСК",
+     OrderType.BUY, ("цемент",), None, (200.0, "тонна"), "Москва"),
+    ("buy4", "Кто продаёт газоблок D500 600х300х200? Нужно 20 поддонов, Нижний",
+     OrderType.BUY, ("газоб", "газоблок"), None, (20.0, "поддон"), "Нижний Новгород"),
+]
+
+
+def _cases(field):
+    """pytest params of (text, expected) for one field, skipping messages without it."""
+    index = {"order_type": 2, "product": 3, "price": 4, "volume": 5, "region": 6}[field]
+    return [
+        pytest.param(row[1], row[index], id=row[0])
+        for row in _MESSAGES if row[index] is not None
+    ]
+
+
+class TestUserMessages:
+    @pytest.mark.parametrize("text, expected", _cases("order_type"))
+    def test_order_type(self, text, expected):
+        assert detect_order_type(text) == expected
+
+    @pytest.mark.parametrize("text, stems", _cases("product"))
+    def test_product(self, text, stems):
+        product, niche = extract_product(text)
         assert product is not None
-        assert "арматур" in product.lower()
-        assert niche == "стройматериалы"
-
-    def test_price(self):
-        price = extract_price(self.text)
-        assert price is not None
-        assert price == Decimal("47000")
-
-    def test_volume(self):
-        vol, unit = extract_volume(self.text)
-        assert vol == 20.0
-        assert unit == "тонна"
-
-    def test_region(self):
-        region = extract_region(self.text)
-        assert region == "Тула"
-
-
-class TestSellMessage2:
-    """Профнастил С21 0.5мм оцинк, 580р/м², наличие 3000м², МСК"""
-
-    text = "Профнастил С21 0.5мм оцинк, 580р/м², наличие 3000м², МСК"
-
-    def test_order_type(self):
-        assert detect_order_type(self.text) == OrderType.SELL
-
-    def test_product(self):
-        product, niche = extract_product(self.text)
-        assert product is not None
-        assert "профнастил" in product.lower()
+        lower = product.lower()
+        assert any(stem in lower for stem in stems)
         assert niche == "стройматериалы"
 
-    def test_price(self):
-        price = extract_price(self.text)
-        assert price is not None
-        assert price == Decimal("580")
-
-    def test_volume(self):
-        vol, unit = extract_volume(self.text)
-        assert vol == 3000.0
-        assert unit == "м²"
-
-    def test_region(self):
-        region = extract_region(self.text)
-        assert region == "Москва"
-
-
-class TestSellMessage3:
-    """Цемент М500 навал, 4200/тн, отгрузка с завода Воскресенск"""
+    @pytest.mark.parametrize("text, expected", _cases("price"))
+    def test_price(self, text, expected):
+        assert extract_price(text) == expected
 
-    text = "Цемент М500 навал, 4200/тн, отгрузка с завода Воскресенск"
+    @pytest.mark.parametrize("text, expected", _cases("volume"))
+    def test_volume(self, text, expected):
+        assert extract_volume(text) == expected
 
-    def test_order_type(self):
-        assert detect_order_type(self.text) == OrderType.SELL
-
-    def test_product(self):
-        product, niche = extract_product(self.text)
-        assert product is not None
-        assert "цемент" in product.lower()
-        assert niche == "стройматериалы"
-
-    def test_price(self):
-        price = extract_price(self.text)
-        assert price is not None
-        assert price == Decimal("4200")
+    @pytest.mark.parametrize("text, expected", _cases("region"))
+    def test_region(self, text, expected):
+        assert extract_region(text) == expected
 
     def test_unit_from_price(self):
         """'4200/тн' should extract unit='тонна' via extract_price_unit."""
-        unit = extract_price_unit(self.text)
-        assert unit == "тонна"
-
-    def test_region(self):
-        region = extract_region(self.text)
-        assert region == "Воскресенск"
-
-
-class TestSellMessage4:
-    """Остатки бруса 150х150, 12000 руб/м³, ~15 кубов, самовывоз Подольск"""
-
-    text = "Остатки бруса 150х150, 12000 руб/м³, ~15 кубов, самовывоз Подольск"
-
-    def test_order_type(self):
-        assert detect_order_type(self.text) == OrderType.SELL
-
-    def test_product(self):
-        product, niche = extract_product(self.text)
-        assert product is not None
-        assert "брус" in product.lower()
-        assert niche == "стройматериалы"
-
-    def test_price(self):
-        price = extract_price(self.text)
-        assert price is not None
-        assert price == Decimal("12000")
-
-    def test_volume(self):
-        vol, unit = extract_volume(self.text)
-        assert vol == 15.0
-        assert unit == "м³"
-
-    def test_region(self):
-        region = extract_region(self.text)
-        assert region == "Подольск"
-
-
-class TestSellMessage5:
-    """Реализуем щебень фр.5-20, 1850/тн, от 1 вагона"""
-
-    text = "Реализуем щебень фр.5-20, 1850/тн, от 1 вагона"
-
-    def test_order_type(self):
-        assert detect_order_type(self.text) == OrderType.SELL
-
-    def test_product(self):
-        product, niche = extract_product(self.text)
-        assert product is not None
-        assert "щебень" in product.lower() or "щебен" in product.lower()
-        assert niche == "стройматериалы"
-
-    def test_price(self):
-        price = extract_price(self.text)
-        assert price is not None
-        assert price == Decimal("1850")
-
-    def test_volume(self):
-        vol, unit = extract_volume(self.text)
-        assert vol == 1.0
-        assert unit == "вагон"
-
-
-# =====================================================
-# BUY messages
-# =====================================================
-
-class TestBuyMessage1:
-    """Нужна арматура 10мм А500С, 40 тонн, Москва, безнал"""
-
-    text = "Нужна арматура 10мм А500С, 40 тонн, Москва, безнал"
-
-    def test_order_type(self):
-        assert detect_order_type(self.text) == OrderType.BUY
-
-    def test_product(self):
-        product, niche = extract_product(self.text)
-        assert product is not None
-        assert "арматур" in product.lower()
-        assert niche == "стройматериалы"
-
-    def test_volume(self):
-        vol, unit = extract_volume(self.text)
-        assert vol == 40.0
-        assert unit == "тонна"
-
-    def test_region(self):
-        region = extract_region(self.text)
-        assert region == "Москва"
-
-
-class TestBuyMessage2:
-    """Ищу профлист С8 окрашенный, ~500м², доставка Казань"""
-
-    text = "Ищу профлист С8 окрашенный, ~500м², доставка Казань"
-
-    def test_order_type(self):
-        assert detect_order_type(self.text) == OrderType.BUY
-
-    def test_product(self):
-        product, niche = extract_product(self.text)
-        assert product is not None
-        assert "профлист" in product.lower()
-        assert niche == "стройматериалы"
-
-    def test_volume(self):
-        vol, unit = extract_volume(self.text)
-        assert vol == 500.0
-        assert unit == "м²"
-
-    def test_region(self):
-        region = extract_region(self.text)
-        assert region == "Казань"
-
-
-class TestBuyMessage3:
-    """Закупаем цемент М400, объём 200 тонн/мес, нужен поставщик МСК"""
-
-    text = "Закупаем цемент М400, объём 200 тонн/мес, нужен поставщик МСК"
-
-    def test_order_type(self):
-        assert detect_order_type(self.text) == OrderType.BUY
-
-    def test_product(self):
-        product, niche = extract_product(self.text)
-        assert product is not None
-        assert "цемент" in product.lower()
-        assert niche == "стройматериалы"
-
-    def test_volume(self):
-        vol, unit = extract_volume(self.text)
-        assert vol == 200.0
-        assert unit == "тонна"
-
-    def test_region(self):
-        region = extract_region(self.text)
-        assert region == "Москва"
-
-
-class TestBuyMessage4:
-    """Кто продаёт газоблок D500 600х300х200? Нужно 20 поддонов, Нижний"""
-
-    text = "Кто продаёт газоблок D500 600х300х200? Нужно 20 поддонов, Нижний"
-
-    def test_order_type(self):
-        assert detect_order_type(self.text) == OrderType.BUY
-
-    def test_product(self):
-        product, niche = extract_product(self.text)
-        assert product is not None
-        assert "газоб" in product.lower() or "газоблок" in product.lower()
-        assert niche == "стройматериалы"
-
-    def test_volume(self):
-        vol, unit = extract_volume(self.text)
-        assert vol == 20.0
-        assert unit == "поддон"
-
-    def test_region(self):
-        region = extract_region(self.text)
-        assert region == "Нижний Новгород"
+        assert extract_price_unit(_MESSAGES[2][1]) == "тонна"
 
 
 # =====================================================
@@ -331,56 +149,50 @@ class TestNormalizeProduct:
 class TestEdgeCases:
     """Edge cases for the parser."""
 
-    def test_price_4200_per_tn(self):
-        """4200/тн should be parsed as price 4200."""
-        price = extract_price("цемент 4200/тн")
-        assert price == Decimal("4200")
-
-    def test_price_1850_per_tn(self):
-        """1850/тн should be parsed as price 1850."""
-        price = extract_price("щебень 1850/тн")
-        assert price == Decimal("1850")
-
-    def test_price_580_per_m2(self):
-        """580р/м² should be parsed as price 580."""
-        price = extract_price("580р/м²")
-        assert price == Decimal("580")
-
-    def test_price_47000_per_tn(self):
-        """47000р/тн should be parsed as price 47000."""
-        price = extract_price("47000р/тн")
-        assert price == Decimal("47000")
-
-    def test_price_12000_rub_per_m3(self):
-        """12000 руб/м³ should be parsed as price 12000."""
-        price = extract_price("12000 руб/м³")
-        assert price == Decimal("12000")
-
-    def test_volume_kubov(self):
-        """'15 кубов' should be parsed as 15.0 м³."""
-        vol, unit = extract_volume("15 кубов")
-        assert vol == 15.0
-        assert unit == "м³"
-
-    def test_volume_tilde_prefix(self):
-        """'~500м²' should still be parsed."""
-        vol, unit = extract_volume("~500м²")
-        assert vol == 500.0
-        assert unit == "м²"
-
-    def test_volume_tn_abbreviation(self):
-        """'20 тн' should be parsed as тонна."""
-        vol, unit = extract_volume("20 тн")
-        assert vol == 20.0
-        assert unit == "тонна"
-
-    def test_nalichie_is_sell(self):
-        """'наличие' alone should trigger sell detection."""
-        assert detect_order_type("наличие 3000м²") == OrderType.SELL
-
-    def test_otgruzka_s_zavoda_is_sell(self):
-        """'отгрузка с завода' should trigger sell detection."""
-        assert detect_order_type("отгрузка с завода") == OrderType.SELL
+    @pytest.mark.parametrize("text, expected", [
+        # Keyword search must be case-insensitive for Cyrillic, not just ASCII
+        pytest.param("КУПЛЮ АРМАТУРУ А500С", OrderType.BUY, id="uppercase_buy"),
+        pytest.param("ПРОДАЁМ ЦЕМЕНТ М500", OrderType.SELL, id="uppercase_sell"),
+        pytest.param("наличие 3000м²", OrderType.SELL, id="nalichie_is_sell"),
+        pytest.param("отгрузка с завода", OrderType.SELL, id="otgruzka_s_zavoda_is_sell"),
+    ])
+    def test_order_type(self, text, expected):
+        assert detect_order_type(text) == expected
+
+    @pytest.mark.parametrize("text, expected", [
+        pytest.param("цемент 4200/тн", Decimal("4200"), id="4200_per_tn"),
+        pytest.param("щебень 1850/тн", Decimal("1850"), id="1850_per_tn"),
+        # 'к' inside the unit name (мешок) must not act as a thousand multiplier
+        pytest.param("цемент 450/мешок", Decimal("450"), id="per_unit_with_k_letter_not_multiplied"),
+        pytest.param("580р/м²", Decimal("580"), id="580_per_m2"),
+        pytest.param("47000р/тн", Decimal("47000"), id="47000_per_tn"),
+        pytest.param("12000 руб/м³", Decimal("12000"), id="12000_rub_per_m3"),
+        # Numbers below the 100 minimum are quantities, not prices
+        pytest.param("от 1 вагона", None, id="ot_prefix_small_number_not_price"),
+        pytest.param("от 20 тонн", None, id="ot_20_tonn_not_price"),
+    ])
+    def test_price(self, text, expected):
+        assert extract_price(text) == expected
+
+    @pytest.mark.parametrize("text, expected", [
+        pytest.param("15 кубов", (15.0, "м³"), id="kubov"),
+        pytest.param("~500м²", (500.0, "м²"), id="tilde_prefix"),
+        pytest.param("20 тн", (20.0, "тонна"), id="tn_abbreviation"),
+    ])
+    def test_volume(self, text, expected):
+        assert extract_volume(text) == expected
+
+    @pytest.mark.parametrize("text, expected", [
+        pytest.param("4200/тн", "тонна", id="4200_per_tn"),
+        pytest.param("47000р/тн", "тонна", id="47000r_per_tn"),
+        pytest.param("580р/м²", "м²", id="580r_per_m2"),
+        pytest.param("12000 руб/м³", "м³", id="12000_rub_per_m3"),
+        pytest.param("1850/тн", "тонна", id="1850_per_tn"),
+        # No price-per-unit expression
+        pytest.param("просто цена 50000", None, id="none_when_no_unit"),
+    ])
+    def test_price_unit(self, text, expected):
+        assert extract_price_unit(text) == expected
 
     def test_voskresensk_region(self):
         """Воскресенск should be recognized as a region."""
@@ -394,41 +206,6 @@ class TestEdgeCases:
         # Should either be None or not match "тонна"
         assert vol is None or unit != "тонна"
 
-    def test_ot_prefix_small_number_not_price(self):
-        """'от 1 вагона' — 1 should NOT be extracted as a price."""
-        # 1 < 100 (min price), so it shouldn't be in the result
-        price = extract_price("от 1 вагона")
-        assert price is None
-
-    def test_ot_20_tonn_not_price(self):
-        """'от 20 тонн' — 20 should NOT be extracted as price (below 100 min)."""
-        price = extract_price("от 20 тонн")
-        assert price is None
-
-    def test_price_unit_4200_per_tn(self):
-        """'4200/тн' → unit='тонна'."""
-        assert extract_price_unit("4200/тн") == "тонна"
-
-    def test_price_unit_47000r_per_tn(self):
-        """'47000р/тн' → unit='тонна'."""
-        assert extract_price_unit("47000р/тн") == "тонна"
-
-    def test_price_unit_580r_per_m2(self):
-        """'580р/м²' → unit='м²'."""
-        assert extract_price_unit("580р/м²") == "м²"
-
-    def test_price_unit_12000_rub_per_m3(self):
-        """'12000 руб/м³' → unit='м³'."""
-        assert extract_price_unit("12000 руб/м³") == "м³"
-
-    def test_price_unit_1850_per_tn(self):
-        """'1850/тн' → unit='тонна'."""
-        assert extract_price_unit("1850/тн") == "тонна"
-
-    def test_price_unit_none_when_no_unit(self):
-        """No price-per-unit expression → None."""
-        assert extract_price_unit("просто цена 50000") is None
-
 
 # =====================================================
 # Full product extraction tests (brand + diameter + size)
@@ -0,0 +1,43 @@
+"""
+Tests for the outbox token-bucket rate limiter.
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.services.rate_limiter import RateLimiter
+
+
+class TestRateLimiter:
+    @pytest.mark.asyncio
+    async def test_burst_within_rate_does_not_wait(self):
+        limiter = RateLimiter(3, 1.0)
+        with patch("src.services.rate_limiter.asyncio.sleep", new_callable=AsyncMock) as sleep:
+            for _ in range(3):
+                await limiter.acquire()
+        sleep.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_over_rate_waits_for_refill(self):
+        limiter = RateLimiter(1, 1.0)
+        with patch("src.services.rate_limiter.asyncio.sleep", new_callable=AsyncMock) as sleep:
+            await limiter.acquire()
+            await limiter.acquire()
+        sleep.assert_awaited_once()
+        assert sleep.await_args.args[0] == pytest.approx(1.0, abs=0.05)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_waiters_queue_up(self):
+        limiter = RateLimiter(1, 1.0)
+        with patch("src.services.rate_limiter.asyncio.sleep", new_callable=AsyncMock) as sleep:
+            for _ in range(3):
+                await limiter.acquire()
+        delays = [call.args[0] for call in sleep.await_args_list]
+        assert delays == [pytest.approx(1.0, abs=0.05), pytest.approx(2.0, abs=0.05)]
+
+    @pytest.mark.asyncio
+    async def test_context_manager(self):
+        limiter = RateLimiter(1, 1.0)
+        async with limiter as acquired:
+            assert acquired is limiter
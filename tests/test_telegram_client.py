@@ -0,0 +1,136 @@
+"""
+Tests for TelegramService send-path helpers.
+
+Covers:
+- Entity LRU cache
+- Incoming message deduplication
+- Background read acknowledgement
+- FloodWait pause propagation
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from telethon.errors import FloodWaitError
+
+from src.services.telegram_client import TelegramService
+
+
+def _make_service():
+    """TelegramService with a mocked Telethon client (no network)."""
+    service = TelegramService()
+    client = SimpleNamespace(
+        get_entity=AsyncMock(side_effect=lambda rid: SimpleNamespace(id=rid)),
+        send_message=AsyncMock(return_value=SimpleNamespace(id=555)),
+        send_read_acknowledge=AsyncMock(),
+    )
+    service.client = client
+    return service, client
+
+
+# ── Entity cache ──────────────────────────────────────────
+
+
+class TestEntityCache:
+    @pytest.mark.asyncio
+    async def test_repeat_sends_resolve_once(self):
+        service, client = _make_service()
+        await service.send_message(111, "раз")
+        await service.send_message(111, "два")
+        assert client.get_entity.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_not_found_is_not_cached(self):
+        service, client = _make_service()
+        client.get_entity.side_effect = ValueError("not found")
+        assert await service.send_message(111, "раз") is None
+        assert 111 not in service._entity_cache
+
+    @pytest.mark.asyncio
+    async def test_cache_is_bounded(self):
+        service, client = _make_service()
+        with patch("src.services.telegram_client._ENTITY_CACHE_MAX", 2):
+            for rid in (1, 2, 3):
+                await service.get_entity(rid)
+        assert list(service._entity_cache) == [2, 3]
+
+
+# ── Incoming deduplication ────────────────────────────────
+
+
+def _make_event(chat_id, message_id):
+    return SimpleNamespace(chat_id=chat_id, message=SimpleNamespace(id=message_id))
+
+
+class TestIncomingDedup:
+    def test_redelivered_event_is_duplicate(self):
+        service, _ = _make_service()
+        assert service._is_duplicate(_make_event(1, 10)) is False
+        assert service._is_duplicate(_make_event(1, 10)) is True
+
+    def test_same_message_id_in_other_chat_is_new(self):
+        service, _ = _make_service()
+        assert service._is_duplicate(_make_event(1, 10)) is False
+        assert service._is_duplicate(_make_event(2, 10)) is False
+
+    def test_seen_set_is_bounded(self):
+        service, _ = _make_service()
+        with patch("src.services.telegram_client._SEEN_MAX", 2):
+            for mid in (1, 2, 3):
+                service._is_duplicate(_make_event(1, mid))
+        assert list(service._seen_msg_ids) == [(1, 2), (1, 3)]
+
+
+# ── Read acknowledgement ──────────────────────────────────
+
+
+class TestReadAcknowledge:
+    @pytest.mark.asyncio
+    async def test_send_does_not_wait_for_ack(self):
+        service, client = _make_service()
+        ack_started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_ack(entity):
+            ack_started.set()
+            await release.wait()
+
+        client.send_read_acknowledge = slow_ack
+        assert await service.send_message(111, "привет") == 555
+        assert len(service._ack_tasks) == 1
+
+        release.set()
+        await asyncio.gather(*service._ack_tasks)
+        await asyncio.sleep(0)
+        assert ack_started.is_set()
+        assert not service._ack_tasks
+
+    @pytest.mark.asyncio
+    async def test_ack_failure_is_swallowed(self):
+        service, client = _make_service()
+        client.send_read_acknowledge = AsyncMock(side_effect=RuntimeError("boom"))
+        assert await service.send_message(111, "привет") == 555
+        await asyncio.gather(*service._ack_tasks, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert not service._ack_tasks
+
+
+# ── FloodWait ─────────────────────────────────────────────
+
+
+class TestFloodWait:
+    @pytest.mark.asyncio
+    async def test_flood_wait_pauses_and_propagates(self):
+        service, client = _make_service()
+        client.send_message.side_effect = FloodWaitError(request=None, capture=30)
+        with pytest.raises(FloodWaitError):
+            await service.send_message(111, "привет")
+        assert service._flood_wait_until > 0
+
+        # The next send waits out the pause before going to Telegram
+        client.send_message.side_effect = None
+        with patch("src.services.telegram_client.asyncio.sleep", new_callable=AsyncMock) as sleep:
+            assert await service.send_message(111, "привет") == 555
+        assert 29 < sleep.await_args.args[0] <= 30
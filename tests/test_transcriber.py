@@ -0,0 +1,60 @@
+"""
+Tests for Whisper voice transcription.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from telethon.utils import encode_waveform
+
+from src.services.transcriber import is_silent_voice, transcribe_voice
+
+
+def _make_client(text):
+    create = AsyncMock(return_value=SimpleNamespace(text=text))
+    client = SimpleNamespace(audio=SimpleNamespace(transcriptions=SimpleNamespace(create=create)))
+    return client, create
+
+
+class TestTranscribeVoice:
+    @pytest.mark.asyncio
+    async def test_uploads_original_bytes_with_filename(self):
+        client, create = _make_client(" нужна арматура ")
+        audio = b"OggS" + b"\x00" * 64
+        with patch("src.services.transcriber._get_client", return_value=client):
+            text = await transcribe_voice(audio, "voice.ogg")
+
+        assert text == "нужна арматура"
+        assert create.await_args.kwargs["file"] == ("voice.ogg", audio)
+
+    @pytest.mark.asyncio
+    async def test_too_short_result_rejected(self):
+        client, _ = _make_client("ээ")
+        with patch("src.services.transcriber._get_client", return_value=client):
+            assert await transcribe_voice(b"OggS", "voice.ogg") is None
+
+    @pytest.mark.asyncio
+    async def test_no_client(self):
+        with patch("src.services.transcriber._get_client", return_value=None):
+            assert await transcribe_voice(b"OggS") is None
+
+
+class TestIsSilentVoice:
+    def test_sub_second_clip_is_silent(self):
+        assert is_silent_voice(0, None)
+
+    def test_no_metadata_is_not_silent(self):
+        assert not is_silent_voice(None, None)
+
+    def test_flat_zero_waveform_is_silent(self):
+        assert is_silent_voice(3, encode_waveform(bytes(100)))
+
+    def test_single_click_is_silent(self):
+        samples = bytearray(100)
+        samples[50] = 31
+        assert is_silent_voice(3, encode_waveform(bytes(samples)))
+
+    def test_speech_waveform_is_not_silent(self):
+        samples = bytes([2, 20, 31, 14, 6] * 20)
+        assert not is_silent_voice(4, encode_waveform(samples))